@@ -0,0 +1,32 @@
+import os
+from datetime import datetime, timedelta
+from typing import Optional
+
+# Secret used to sign and verify bearer tokens. Without it the API runs in single-owner
+# mode: every request belongs to DEFAULT_OWNER_ID and no client can pick another owner.
+SECRET_KEY = os.getenv("JWT_SECRET_KEY")
+ALGORITHM = os.getenv("JWT_ALGORITHM", "HS256")
+# Lifetime of tokens issued by create_access_token
+ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", str(60 * 24)))
+
+
+class InvalidToken(Exception):
+    pass
+
+
+def auth_enabled() -> bool:
+    return bool(SECRET_KEY)
+
+def create_access_token(owner_id: int, expires_delta: Optional[timedelta] = None) -> str:
+    # The owner is the token's subject; python-jose is only imported when tokens are used
+    from jose import jwt
+    expires = datetime.utcnow() + (expires_delta or timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES))
+    return jwt.encode({"sub": str(owner_id), "exp": expires}, SECRET_KEY, algorithm=ALGORITHM)
+
+def decode_owner_id(token: str) -> int:
+    from jose import JWTError, jwt
+    try:
+        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        return int(payload["sub"])
+    except (JWTError, KeyError, TypeError, ValueError):
+        raise InvalidToken()
@@ -1,17 +1,84 @@
-from sqlalchemy.orm import Session
-import models, schemas
+from sqlalchemy import func
+from sqlalchemy.orm import Session, joinedload
+import heapq
+import itertools
+import models, schemas, money, recurrence
 from datetime import datetime
+from typing import Optional
 
 # CRUD for expenses
-def get_expense(db: Session, expense_id: int):
-    return db.query(models.Expense).filter(models.Expense.id == expense_id).first()
+# Every query is scoped to the owner; (owner_id, date) is indexed so the cost depends on
+# the owner's own rows rather than the size of the whole table
+def get_expense(db: Session, owner_id: int, expense_id: int):
+    return db.query(models.Expense).filter(
+        models.Expense.owner_id == owner_id,
+        models.Expense.id == expense_id
+    ).first()
 
-def get_expenses(db: Session, skip: int = 0, limit: int = 100):
-    return db.query(models.Expense).offset(skip).limit(limit).all()
+def get_expenses(db: Session, owner_id: int, skip: int = 0, limit: int = 100,
+                 start_date: Optional[datetime] = None, end_date: Optional[datetime] = None,
+                 include_projected: bool = False):
+    query = db.query(models.Expense).filter(models.Expense.owner_id == owner_id)
+    query = _filter_by_date(query, start_date, end_date)
+    if not include_projected or end_date is None:
+        return query.offset(skip).limit(limit).all()
 
-def create_expense(db: Session, expense: schemas.ExpenseCreate):
+    # Merge stored expenses with projected recurring occurrences by date. Neither side
+    # needs more than skip + limit rows, and projections are generated lazily.
+    stored = query.order_by(models.Expense.date).limit(skip + limit).all()
+    projected = recurrence.project(db, owner_id, start_date, end_date)
+    merged = heapq.merge(stored, projected, key=lambda expense: expense.date)
+    return list(itertools.islice(merged, skip, skip + limit))
+
+def _filter_by_date(query, start_date: Optional[datetime], end_date: Optional[datetime]):
+    # Date bounds let PostgreSQL prune partitions outside the requested range
+    if start_date is not None:
+        query = query.filter(models.Expense.date >= start_date)
+    if end_date is not None:
+        query = query.filter(models.Expense.date < end_date)
+    return query
+
+def get_expense_summary(db: Session, owner_id: int,
+                        start_date: Optional[datetime] = None, end_date: Optional[datetime] = None,
+                        include_projected: bool = False):
+    # Totals are summed as integer minor units in SQL, so they're exact
+    query = db.query(
+        models.Expense.category_id,
+        func.sum(models.Expense.amount_minor),
+        func.count(models.Expense.id),
+    ).filter(
+        models.Expense.owner_id == owner_id
+    ).group_by(models.Expense.category_id).order_by(models.Expense.category_id)
+    rows = _filter_by_date(query, start_date, end_date).all()
+
+    totals = {category_id: (count, int(total)) for category_id, total, count in rows}
+
+    # Projected recurring occurrences are counted arithmetically, never generated
+    projected_count = 0
+    if include_projected and end_date is not None:
+        for category_id, (count, total) in recurrence.projected_totals(db, owner_id, start_date, end_date).items():
+            stored_count, stored_total = totals.get(category_id, (0, 0))
+            totals[category_id] = (stored_count + count, stored_total + total)
+            projected_count += count
+
+    by_category = [
+        {"category_id": category_id, "total": money.from_minor(total), "total_minor": total, "count": count}
+        # Uncategorized expenses (category_id None) are listed last
+        for category_id, (count, total) in sorted(totals.items(), key=lambda item: (item[0] is None, item[0] or 0))
+    ]
+    total_minor = sum(row["total_minor"] for row in by_category)
+    return {
+        "total": money.from_minor(total_minor),
+        "total_minor": total_minor,
+        "count": sum(row["count"] for row in by_category),
+        "projected_count": projected_count,
+        "by_category": by_category,
+    }
+
+def create_expense(db: Session, owner_id: int, expense: schemas.ExpenseCreate):
     date = expense.date or datetime.now()
     db_expense = models.Expense(
+        owner_id=owner_id,
         title=expense.title,
         amount=expense.amount,
         date=date,
@@ -23,8 +90,8 @@ def create_expense(db: Session, expense: schemas.ExpenseCreate):
     db.refresh(db_expense)
     return db_expense
 
-def update_expense(db: Session, expense_id: int, expense: schemas.ExpenseUpdate):
-    db_expense = get_expense(db, expense_id)
+def update_expense(db: Session, owner_id: int, expense_id: int, expense: schemas.ExpenseUpdate):
+    db_expense = get_expense(db, owner_id, expense_id)
     
     if expense.title is not None:
         db_expense.title = expense.title
@@ -41,24 +108,57 @@ def update_expense(db: Session, expense_id: int, expense: schemas.ExpenseUpdate)
     db.refresh(db_expense)
     return db_expense
 
-def delete_expense(db: Session, expense_id: int):
-    db_expense = get_expense(db, expense_id)
+def delete_expense(db: Session, owner_id: int, expense_id: int):
+    db_expense = get_expense(db, owner_id, expense_id)
     db.delete(db_expense)
     db.commit()
     return db_expense
 
+# CRUD for recurring expenses
+def get_recurring_expense(db: Session, owner_id: int, recurring_id: int):
+    # The category is loaded up front so a deleted rule can still be returned
+    return db.query(models.RecurringExpense).options(joinedload(models.RecurringExpense.category)).filter(
+        models.RecurringExpense.owner_id == owner_id,
+        models.RecurringExpense.id == recurring_id
+    ).first()
+
+def get_recurring_expenses(db: Session, owner_id: int, skip: int = 0, limit: int = 100):
+    return db.query(models.RecurringExpense).filter(
+        models.RecurringExpense.owner_id == owner_id
+    ).offset(skip).limit(limit).all()
+
+def create_recurring_expense(db: Session, owner_id: int, recurring: schemas.RecurringExpenseCreate):
+    db_recurring = models.RecurringExpense(owner_id=owner_id, **recurring.dict())
+    db.add(db_recurring)
+    db.commit()
+    db.refresh(db_recurring)
+    return db_recurring
+
+def delete_recurring_expense(db: Session, owner_id: int, recurring_id: int):
+    # Already materialized occurrences stay as regular expenses
+    db_recurring = get_recurring_expense(db, owner_id, recurring_id)
+    db.delete(db_recurring)
+    db.commit()
+    return db_recurring
+
 # CRUD for categories
-def get_category(db: Session, category_id: int):
-    return db.query(models.Category).filter(models.Category.id == category_id).first()
+def get_category(db: Session, owner_id: int, category_id: int):
+    return db.query(models.Category).filter(
+        models.Category.owner_id == owner_id,
+        models.Category.id == category_id
+    ).first()
 
-def get_category_by_name(db: Session, name: str):
-    return db.query(models.Category).filter(models.Category.name == name).first()
+def get_category_by_name(db: Session, owner_id: int, name: str):
+    return db.query(models.Category).filter(
+        models.Category.owner_id == owner_id,
+        models.Category.name == name
+    ).first()
 
-def get_categories(db: Session, skip: int = 0, limit: int = 100):
-    return db.query(models.Category).offset(skip).limit(limit).all()
+def get_categories(db: Session, owner_id: int, skip: int = 0, limit: int = 100):
+    return db.query(models.Category).filter(models.Category.owner_id == owner_id).offset(skip).limit(limit).all()
 
-def create_category(db: Session, category: schemas.CategoryCreate):
-    db_category = models.Category(name=category.name)
+def create_category(db: Session, owner_id: int, category: schemas.CategoryCreate):
+    db_category = models.Category(owner_id=owner_id, name=category.name)
     db.add(db_category)
     db.commit()
     db.refresh(db_category)
@@ -0,0 +1,199 @@
+import asyncio
+import hashlib
+import os
+import re
+import time
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from starlette.responses import JSONResponse
+
+# Seconds a stored response can be replayed for
+TTL_SECONDS = float(os.getenv("IDEMPOTENCY_TTL", str(24 * 60 * 60)))
+# Maximum number of stored responses; the oldest are evicted first
+MAX_ENTRIES = int(os.getenv("IDEMPOTENCY_MAX_KEYS", "10000"))
+# Longest Idempotency-Key accepted
+MAX_KEY_LENGTH = 255
+
+HEADER = b"idempotency-key"
+
+
+# A completed response, kept so a retry can be answered without running the endpoint again
+class StoredResponse:
+    __slots__ = ("fingerprint", "status", "headers", "body", "expires_at")
+
+    def __init__(self, fingerprint: bytes, status: int, headers: List[Tuple[bytes, bytes]], body: bytes, expires_at: float):
+        self.fingerprint = fingerprint
+        self.status = status
+        self.headers = headers
+        self.body = body
+        self.expires_at = expires_at
+
+
+class IdempotencyStore:
+    """
+    In-process store of responses keyed by Idempotency-Key.
+
+    Keys are stored as fixed-size digests and responses as raw bytes. Every entry lives
+    for the same TTL, so insertion order is also expiry order and eviction only looks at
+    the oldest entries. Requests still being handled are tracked separately, so
+    concurrent retries wait for the first one instead of running the endpoint again.
+    """
+    def __init__(self, ttl: float = TTL_SECONDS, max_entries: int = MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._responses: "OrderedDict[bytes, StoredResponse]" = OrderedDict()
+        self._in_flight: Dict[bytes, asyncio.Event] = {}
+
+    def get(self, key: bytes) -> Optional[StoredResponse]:
+        self._evict()
+        return self._responses.get(key)
+
+    def begin(self, key: bytes) -> Optional[asyncio.Event]:
+        # None if the caller now owns the key, otherwise an event set when its owner finishes
+        waiter = self._in_flight.get(key)
+        if waiter is None:
+            self._in_flight[key] = asyncio.Event()
+        return waiter
+
+    def finish(self, key: bytes, fingerprint: bytes, status: int = None,
+               headers: List[Tuple[bytes, bytes]] = None, body: bytes = None):
+        # Without a response the key is freed, so the next retry runs the endpoint again
+        if status is not None:
+            self._responses[key] = StoredResponse(fingerprint, status, headers, body, time.monotonic() + self.ttl)
+            self._responses.move_to_end(key)
+            self._evict()
+        waiter = self._in_flight.pop(key, None)
+        if waiter is not None:
+            waiter.set()
+
+    def __len__(self):
+        return len(self._responses)
+
+    def _evict(self):
+        now = time.monotonic()
+        while self._responses:
+            oldest = next(iter(self._responses.values()))
+            if oldest.expires_at > now and len(self._responses) <= self.max_entries:
+                break
+            self._responses.popitem(last=False)
+
+
+# Shared store for the application process
+store = IdempotencyStore()
+
+
+def compile_route(path: str):
+    # /expenses/{expense_id} -> ^/expenses/[^/]+$
+    return re.compile("^" + re.sub(r"\{[^}]+\}", "[^/]+", path) + "$")
+
+
+class IdempotencyMiddleware:
+    """
+    Replays the stored response for write requests retried with the same Idempotency-Key
+    header, without running the endpoint again.
+
+    Only the given (method, path) routes are covered. A key is scoped to the method, path
+    and `scope_headers` (such as the owner), and reusing it with a different body is
+    rejected. Server errors aren't stored, so those requests can be retried.
+    """
+    def __init__(self, app, store: IdempotencyStore, routes: Iterable[Tuple[str, str]],
+                 scope_headers: Iterable[str] = ()):
+        self.app = app
+        self.store = store
+        self.routes = [(method.upper(), compile_route(path)) for method, path in routes]
+        self.scope_headers = [header.lower().encode() for header in scope_headers]
+
+    def _covers(self, scope):
+        return scope["type"] == "http" and any(
+            scope["method"] == method and pattern.match(scope["path"]) for method, pattern in self.routes
+        )
+
+    async def __call__(self, scope, receive, send):
+        if not self._covers(scope):
+            return await self.app(scope, receive, send)
+        headers = dict(scope["headers"])
+        idempotency_key = headers.get(HEADER)
+        if idempotency_key is None:
+            return await self.app(scope, receive, send)
+        if not idempotency_key or len(idempotency_key) > MAX_KEY_LENGTH:
+            response = JSONResponse(
+                {"detail": f"Idempotency-Key must be 1 to {MAX_KEY_LENGTH} characters"}, status_code=400
+            )
+            return await response(scope, receive, send)
+
+        body = await _read_body(receive)
+        if body is None:
+            # The client went away mid-request; leave the key free for its retry
+            return
+        key = hashlib.sha256(b"\0".join(
+            [scope["method"].encode(), scope["path"].encode(), idempotency_key]
+            + [headers.get(header, b"") for header in self.scope_headers]
+        )).digest()
+        fingerprint = hashlib.sha256(body).digest()
+
+        # Wait for any in-flight request with the same key, then replay its response
+        while True:
+            stored = self.store.get(key)
+            if stored is not None:
+                if stored.fingerprint != fingerprint:
+                    response = JSONResponse(
+                        {"detail": "Idempotency-Key was already used with a different request"}, status_code=422
+                    )
+                    return await response(scope, receive, send)
+                await send({
+                    "type": "http.response.start",
+                    "status": stored.status,
+                    "headers": stored.headers + [(b"idempotent-replayed", b"true")],
+                })
+                await send({"type": "http.response.body", "body": stored.body})
+                return
+            waiter = self.store.begin(key)
+            if waiter is None:
+                break
+            await waiter.wait()
+
+        response_start = None
+        chunks = []
+        complete = False
+        pending_body = body
+
+        async def replay_receive():
+            # The body was already read to fingerprint it, so hand it over once more
+            nonlocal pending_body
+            if pending_body is not None:
+                message = {"type": "http.request", "body": pending_body, "more_body": False}
+                pending_body = None
+                return message
+            return await receive()
+
+        async def capture_send(message):
+            nonlocal response_start, complete
+            if message["type"] == "http.response.start":
+                response_start = message
+            elif message["type"] == "http.response.body":
+                chunks.append(message.get("body", b""))
+                complete = not message.get("more_body", False)
+            await send(message)
+
+        try:
+            await self.app(scope, replay_receive, capture_send)
+        finally:
+            if complete and response_start["status"] < 500:
+                self.store.finish(key, fingerprint, response_start["status"],
+                                  list(response_start.get("headers", [])), b"".join(chunks))
+            else:
+                self.store.finish(key, fingerprint)
+
+
+# The whole request body, or None if the client disconnects first
+async def _read_body(receive):
+    chunks = []
+    while True:
+        message = await receive()
+        if message["type"] == "http.disconnect":
+            return None
+        chunks.append(message.get("body", b""))
+        if not message.get("more_body", False):
+            break
+    return b"".join(chunks)
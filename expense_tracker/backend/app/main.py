@@ -1,14 +1,36 @@
+import asyncio
+import logging
+import os
 from fastapi import FastAPI, Depends, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
 from sqlalchemy.orm import Session
-from typing import List
-import models, schemas, crud
+from typing import List, Optional
+from datetime import datetime
+import models, schemas, crud, partitions, recurrence, idempotency, auth
 from database import SessionLocal, engine
 
 models.Base.metadata.create_all(bind=engine)
+partitions.ensure_partitions(engine)
 
 app = FastAPI(title="Expense Tracker API")
 
+# Seconds between runs of the recurring expense materializer (0 disables it, e.g. when
+# materialize_recurring.py runs from cron instead)
+RECURRING_MATERIALIZE_INTERVAL = float(os.getenv("RECURRING_MATERIALIZE_INTERVAL", "3600"))
+
+logger = logging.getLogger(__name__)
+
+# Retried writes with an Idempotency-Key header get the stored response back. Keys are
+# scoped to the bearer token, so two owners can't collide on the same key.
+app.add_middleware(
+    idempotency.IdempotencyMiddleware,
+    store=idempotency.store,
+    routes=[("POST", "/expenses/")],
+    scope_headers=["Authorization"],
+)
+
 # Configure CORS
 app.add_middleware(
     CORSMiddleware,
@@ -26,48 +48,153 @@ def get_db():
     finally:
         db.close()
 
+if not auth.auth_enabled():
+    logger.warning("JWT_SECRET_KEY is not set; running in single-owner mode as owner %s", models.DEFAULT_OWNER_ID)
+
+bearer_scheme = HTTPBearer(auto_error=False)
+
+# Dependency to get the owner (user/tenant) every query is scoped to, from the bearer token
+def get_owner_id(credentials: Optional[HTTPAuthorizationCredentials] = Depends(bearer_scheme)):
+    if not auth.auth_enabled():
+        return models.DEFAULT_OWNER_ID
+    if credentials is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Not authenticated",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    try:
+        return auth.decode_owner_id(credentials.credentials)
+    except auth.InvalidToken:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid or expired token",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+
+# Expenses can only reference the owner's own categories
+def check_category(db: Session, owner_id: int, category_id: int):
+    if crud.get_category(db, owner_id=owner_id, category_id=category_id) is None:
+        raise HTTPException(status_code=404, detail="Category not found")
+
+# Turn due recurring occurrences into stored expenses in the background
+def materialize_recurring():
+    db = SessionLocal()
+    try:
+        return recurrence.materialize(db)
+    finally:
+        db.close()
+
+async def materialize_recurring_periodically():
+    while True:
+        try:
+            await run_in_threadpool(materialize_recurring)
+        except Exception:
+            logger.exception("Materializing recurring expenses failed")
+        await asyncio.sleep(RECURRING_MATERIALIZE_INTERVAL)
+
+@app.on_event("startup")
+async def start_recurring_materializer():
+    if RECURRING_MATERIALIZE_INTERVAL > 0:
+        app.state.recurring_materializer = asyncio.create_task(materialize_recurring_periodically())
+
+@app.on_event("shutdown")
+async def stop_recurring_materializer():
+    task = getattr(app.state, "recurring_materializer", None)
+    if task is not None:
+        task.cancel()
+
 @app.get("/")
 def read_root():
     return {"message": "Welcome to Expense Tracker API"}
 
 @app.post("/expenses/", response_model=schemas.Expense)
-def create_expense(expense: schemas.ExpenseCreate, db: Session = Depends(get_db)):
-    return crud.create_expense(db=db, expense=expense)
+def create_expense(expense: schemas.ExpenseCreate, owner_id: int = Depends(get_owner_id), db: Session = Depends(get_db)):
+    check_category(db, owner_id, expense.category_id)
+    return crud.create_expense(db=db, owner_id=owner_id, expense=expense)
 
 @app.get("/expenses/", response_model=List[schemas.Expense])
-def read_expenses(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    expenses = crud.get_expenses(db, skip=skip, limit=limit)
+def read_expenses(skip: int = 0, limit: int = 100, start_date: Optional[datetime] = None,
+                  end_date: Optional[datetime] = None, include_projected: bool = True,
+                  owner_id: int = Depends(get_owner_id), db: Session = Depends(get_db)):
+    # Without a start date only recent months are listed, so PostgreSQL only scans their partitions
+    if start_date is None:
+        start_date = partitions.recent_window_start(end_date)
+    # Upcoming recurring occurrences are included when an end date bounds the range
+    expenses = crud.get_expenses(db, owner_id=owner_id, skip=skip, limit=limit,
+                                 start_date=start_date, end_date=end_date,
+                                 include_projected=include_projected)
     return expenses
 
+@app.get("/expenses/summary", response_model=schemas.ExpenseSummary)
+def read_expense_summary(start_date: Optional[datetime] = None, end_date: Optional[datetime] = None,
+                         include_projected: bool = True, owner_id: int = Depends(get_owner_id),
+                         db: Session = Depends(get_db)):
+    return crud.get_expense_summary(db, owner_id=owner_id, start_date=start_date, end_date=end_date,
+                                    include_projected=include_projected)
+
 @app.get("/expenses/{expense_id}", response_model=schemas.Expense)
-def read_expense(expense_id: int, db: Session = Depends(get_db)):
-    db_expense = crud.get_expense(db, expense_id=expense_id)
+def read_expense(expense_id: int, owner_id: int = Depends(get_owner_id), db: Session = Depends(get_db)):
+    db_expense = crud.get_expense(db, owner_id=owner_id, expense_id=expense_id)
     if db_expense is None:
         raise HTTPException(status_code=404, detail="Expense not found")
     return db_expense
 
 @app.put("/expenses/{expense_id}", response_model=schemas.Expense)
-def update_expense(expense_id: int, expense: schemas.ExpenseUpdate, db: Session = Depends(get_db)):
-    db_expense = crud.get_expense(db, expense_id=expense_id)
+def update_expense(expense_id: int, expense: schemas.ExpenseUpdate, owner_id: int = Depends(get_owner_id),
+                   db: Session = Depends(get_db)):
+    db_expense = crud.get_expense(db, owner_id=owner_id, expense_id=expense_id)
     if db_expense is None:
         raise HTTPException(status_code=404, detail="Expense not found")
-    return crud.update_expense(db=db, expense_id=expense_id, expense=expense)
+    if expense.category_id is not None:
+        check_category(db, owner_id, expense.category_id)
+    return crud.update_expense(db=db, owner_id=owner_id, expense_id=expense_id, expense=expense)
 
 @app.delete("/expenses/{expense_id}", response_model=schemas.Expense)
-def delete_expense(expense_id: int, db: Session = Depends(get_db)):
-    db_expense = crud.get_expense(db, expense_id=expense_id)
+def delete_expense(expense_id: int, owner_id: int = Depends(get_owner_id), db: Session = Depends(get_db)):
+    db_expense = crud.get_expense(db, owner_id=owner_id, expense_id=expense_id)
     if db_expense is None:
         raise HTTPException(status_code=404, detail="Expense not found")
-    return crud.delete_expense(db=db, expense_id=expense_id)
+    return crud.delete_expense(db=db, owner_id=owner_id, expense_id=expense_id)
+
+@app.post("/recurring-expenses/", response_model=schemas.RecurringExpense)
+def create_recurring_expense(recurring: schemas.RecurringExpenseCreate, owner_id: int = Depends(get_owner_id),
+                             db: Session = Depends(get_db)):
+    check_category(db, owner_id, recurring.category_id)
+    return crud.create_recurring_expense(db=db, owner_id=owner_id, recurring=recurring)
+
+@app.get("/recurring-expenses/", response_model=List[schemas.RecurringExpense])
+def read_recurring_expenses(skip: int = 0, limit: int = 100, owner_id: int = Depends(get_owner_id),
+                            db: Session = Depends(get_db)):
+    return crud.get_recurring_expenses(db, owner_id=owner_id, skip=skip, limit=limit)
+
+@app.get("/recurring-expenses/{recurring_id}", response_model=schemas.RecurringExpense)
+def read_recurring_expense(recurring_id: int, owner_id: int = Depends(get_owner_id), db: Session = Depends(get_db)):
+    db_recurring = crud.get_recurring_expense(db, owner_id=owner_id, recurring_id=recurring_id)
+    if db_recurring is None:
+        raise HTTPException(status_code=404, detail="Recurring expense not found")
+    return db_recurring
+
+@app.delete("/recurring-expenses/{recurring_id}", response_model=schemas.RecurringExpense)
+def delete_recurring_expense(recurring_id: int, owner_id: int = Depends(get_owner_id),
+                             db: Session = Depends(get_db)):
+    db_recurring = crud.get_recurring_expense(db, owner_id=owner_id, recurring_id=recurring_id)
+    if db_recurring is None:
+        raise HTTPException(status_code=404, detail="Recurring expense not found")
+    return crud.delete_recurring_expense(db=db, owner_id=owner_id, recurring_id=recurring_id)
 
 @app.get("/categories/", response_model=List[schemas.Category])
-def read_categories(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    categories = crud.get_categories(db, skip=skip, limit=limit)
+def read_categories(skip: int = 0, limit: int = 100, owner_id: int = Depends(get_owner_id),
+                    db: Session = Depends(get_db)):
+    categories = crud.get_categories(db, owner_id=owner_id, skip=skip, limit=limit)
     return categories
 
 @app.post("/categories/", response_model=schemas.Category)
-def create_category(category: schemas.CategoryCreate, db: Session = Depends(get_db)):
-    return crud.create_category(db=db, category=category)
+def create_category(category: schemas.CategoryCreate, owner_id: int = Depends(get_owner_id),
+                    db: Session = Depends(get_db)):
+    if crud.get_category_by_name(db, owner_id=owner_id, name=category.name) is not None:
+        raise HTTPException(status_code=400, detail="Category already exists")
+    return crud.create_category(db=db, owner_id=owner_id, category=category)
 
 if __name__ == "__main__":
     import uvicorn
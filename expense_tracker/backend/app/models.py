@@ -1,26 +1,86 @@
-from sqlalchemy import Boolean, Column, ForeignKey, Integer, String, Float, DateTime, Text
+from sqlalchemy import BigInteger, Boolean, Column, ForeignKey, Index, Integer, String, DateTime, Text, UniqueConstraint
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
+import os
 
-from database import Base
+from database import Base, engine
+import money
+
+# Expenses are range-partitioned by month on PostgreSQL; the partition key has to be
+# part of the primary key there. SQLite keeps a single, unpartitioned table.
+PARTITIONED = engine.dialect.name == "postgresql"
+
+# Every category and expense belongs to an owner (user/tenant). Requests without an
+# owner, and rows created before ownership existed, belong to this one.
+DEFAULT_OWNER_ID = int(os.getenv("DEFAULT_OWNER_ID", "1"))
 
 class Category(Base):
     __tablename__ = "categories"
+    __table_args__ = (UniqueConstraint("owner_id", "name", name="uq_categories_owner_name"),)
 
     id = Column(Integer, primary_key=True, index=True)
-    name = Column(String, unique=True, index=True)
+    owner_id = Column(Integer, nullable=False, default=DEFAULT_OWNER_ID)
+    name = Column(String, index=True)
     
     expenses = relationship("Expense", back_populates="category")
+    recurring_expenses = relationship("RecurringExpense", back_populates="category")
 
 
 class Expense(Base):
     __tablename__ = "expenses"
+    __table_args__ = (
+        # Every expense query is scoped to one owner, usually over a date range
+        Index("ix_expenses_owner_date", "owner_id", "date"),
+        {"postgresql_partition_by": "RANGE (date)"} if PARTITIONED
+        else {"sqlite_autoincrement": True},
+    )
 
-    id = Column(Integer, primary_key=True, index=True)
+    id = Column(Integer, primary_key=True, autoincrement=True, index=True)
+    owner_id = Column(Integer, nullable=False, default=DEFAULT_OWNER_ID)
     title = Column(String, index=True)
-    amount = Column(Float)
-    date = Column(DateTime, default=func.now())
+    # Stored in minor units (cents); use `amount` for the decimal value
+    amount_minor = Column(BigInteger, nullable=False)
+    date = Column(DateTime, default=func.now(), primary_key=PARTITIONED, nullable=False, index=True)
     notes = Column(Text, nullable=True)
     category_id = Column(Integer, ForeignKey("categories.id"))
+    # The recurring expense this was materialized from; kept after the rule is deleted
+    recurring_id = Column(Integer, nullable=True)
     
     category = relationship("Category", back_populates="expenses")
+
+    @property
+    def amount(self):
+        return money.from_minor(self.amount_minor)
+
+    @amount.setter
+    def amount(self, value):
+        self.amount_minor = money.to_minor(value)
+
+
+class RecurringExpense(Base):
+    """A rule such as "rent, monthly on the 1st"; occurrences are generated on demand."""
+    __tablename__ = "recurring_expenses"
+
+    id = Column(Integer, primary_key=True, index=True)
+    owner_id = Column(Integer, nullable=False, default=DEFAULT_OWNER_ID, index=True)
+    title = Column(String, nullable=False)
+    amount_minor = Column(BigInteger, nullable=False)
+    notes = Column(Text, nullable=True)
+    category_id = Column(Integer, ForeignKey("categories.id"))
+    # daily, weekly, monthly or yearly, repeated every `interval` periods
+    frequency = Column(String, nullable=False)
+    interval = Column(Integer, nullable=False, default=1)
+    start_date = Column(DateTime, nullable=False)
+    end_date = Column(DateTime, nullable=True)
+    # Occurrences before this point have been inserted as expenses; later ones are projected
+    materialized_until = Column(DateTime, nullable=True)
+
+    category = relationship("Category", back_populates="recurring_expenses")
+
+    @property
+    def amount(self):
+        return money.from_minor(self.amount_minor)
+
+    @amount.setter
+    def amount(self, value):
+        self.amount_minor = money.to_minor(value)
@@ -0,0 +1,16 @@
+from decimal import Decimal, ROUND_HALF_UP
+
+# Amounts are stored as integer minor units (cents) so sums are exact and cheap
+MINOR_UNITS = 100
+CENT = Decimal("0.01")
+# Largest amount accepted from clients, well inside a BIGINT of minor units so totals
+# over many expenses still fit
+MAX_AMOUNT = Decimal("1000000000000")
+
+def to_minor(amount) -> int:
+    # Floats go through str() so 12.1 becomes 1210 rather than 1209
+    value = amount if isinstance(amount, Decimal) else Decimal(str(amount))
+    return int(value.quantize(CENT, rounding=ROUND_HALF_UP) * MINOR_UNITS)
+
+def from_minor(amount_minor: int) -> Decimal:
+    return (Decimal(amount_minor) / MINOR_UNITS).quantize(CENT)
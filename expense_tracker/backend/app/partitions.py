@@ -0,0 +1,266 @@
+import csv
+import gzip
+import os
+from datetime import datetime
+
+from sqlalchemy import Column, MetaData, Table, insert, select, text
+
+import models, money
+
+# Number of months (including the current one) GET /expenses/ covers when no start_date is given
+RECENT_MONTHS = int(os.getenv("EXPENSE_RECENT_MONTHS", "6"))
+# Number of future monthly partitions created ahead of time on PostgreSQL
+PARTITIONS_AHEAD = int(os.getenv("EXPENSE_PARTITIONS_AHEAD", "3"))
+# Directory holding archived partitions
+ARCHIVE_DIR = os.getenv("EXPENSE_ARCHIVE_DIR", "archive")
+
+DEFAULT_PARTITION = "expenses_default"
+
+expense_table = models.Expense.__table__
+COLUMNS = [column.name for column in expense_table.columns]
+
+
+# Period helpers: a period is the (year, month) tuple of the first day of a month
+def period_of(value: datetime):
+    return (value.year, value.month)
+
+def add_months(period, months: int):
+    index = period[0] * 12 + period[1] - 1 + months
+    return (index // 12, index % 12 + 1)
+
+def period_bounds(period):
+    return datetime(period[0], period[1], 1), datetime(*add_months(period, 1), 1)
+
+def recent_window_start(end: datetime = None, months: int = RECENT_MONTHS):
+    # First day of the `months` months up to `end` (or now, for ranges reaching into the future)
+    now = datetime.now()
+    end = now if end is None else min(end, now)
+    return period_bounds(add_months(period_of(end), 1 - months))[0]
+
+def period_table_name(period):
+    return f"expenses_{period[0]:04d}_{period[1]:02d}"
+
+def parse_period(name: str):
+    # "expenses_2024_01" -> (2024, 1); returns None for anything else
+    parts = name.rsplit("_", 2)
+    if len(parts) != 3 or parts[0] != "expenses" or not (parts[1].isdigit() and parts[2].isdigit()):
+        return None
+    return (int(parts[1]), int(parts[2]))
+
+def _period_table(name: str):
+    # Unindexed copy of the expenses columns, used for partitions being split or detached
+    return Table(name, MetaData(), *(Column(c.name, c.type) for c in expense_table.columns))
+
+
+def is_postgres(engine):
+    return engine.dialect.name == "postgresql"
+
+def list_partitions(conn):
+    """Return the periods that currently have their own partition (PostgreSQL only)."""
+    names = conn.execute(text(
+        "SELECT c.relname FROM pg_inherits i "
+        "JOIN pg_class c ON c.oid = i.inhrelid "
+        "JOIN pg_class p ON p.oid = i.inhparent "
+        "WHERE p.relname = :parent"
+    ), {"parent": expense_table.name}).scalars()
+    return sorted(period for period in map(parse_period, names) if period is not None)
+
+
+# PostgreSQL native range partitions
+def _is_partitioned(conn):
+    return conn.execute(text(
+        "SELECT 1 FROM pg_partitioned_table pt JOIN pg_class c ON c.oid = pt.partrelid "
+        "WHERE c.relname = :name"
+    ), {"name": expense_table.name}).first() is not None
+
+def needs_partition_migration(engine):
+    """True when PostgreSQL still has an unpartitioned `expenses` table (see migrate_partitions.py)."""
+    if not is_postgres(engine):
+        return False
+    with engine.connect() as conn:
+        return not _is_partitioned(conn)
+
+def _create_pg_partition(conn, period):
+    start, end = period_bounds(period)
+    conn.execute(text(
+        f"CREATE TABLE IF NOT EXISTS {period_table_name(period)} PARTITION OF {expense_table.name} "
+        f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+    ))
+
+def _split_default_partition(conn):
+    # Rows that landed in the default partition get moved into a proper monthly partition.
+    # A partition can't be created over rows sitting in the default one, so build the table
+    # on its own, move the rows across and then attach it.
+    default = _period_table(DEFAULT_PARTITION)
+    periods = {
+        period_of(value)
+        for value in conn.execute(select(default.c.date).distinct()).scalars()
+    }
+    for period in sorted(periods):
+        name = period_table_name(period)
+        start, end = period_bounds(period)
+        in_period = (default.c.date >= start) & (default.c.date < end)
+        conn.execute(text(f"CREATE TABLE {name} (LIKE {expense_table.name} INCLUDING DEFAULTS)"))
+        conn.execute(insert(_period_table(name)).from_select(COLUMNS, select(default).where(in_period)))
+        conn.execute(default.delete().where(in_period))
+        conn.execute(text(
+            f"ALTER TABLE {expense_table.name} ATTACH PARTITION {name} "
+            f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+        ))
+
+
+def create_partitions(conn, months_ahead: int = PARTITIONS_AHEAD):
+    """Create the default and upcoming partitions of a partitioned PostgreSQL `expenses` table."""
+    conn.execute(text(
+        f"CREATE TABLE IF NOT EXISTS {DEFAULT_PARTITION} PARTITION OF {expense_table.name} DEFAULT"
+    ))
+    # A partition can't be created while the default one holds rows for its range,
+    # e.g. an expense dated further ahead than the partitions created so far
+    _split_default_partition(conn)
+    current = period_of(datetime.now())
+    for offset in range(months_ahead + 1):
+        _create_pg_partition(conn, add_months(current, offset))
+
+def ensure_partitions(engine, months_ahead: int = PARTITIONS_AHEAD):
+    """Create the partitions needed to accept writes; called on startup.
+
+    SQLite keeps every live expense in the single `expenses` table, so there is nothing to do.
+    """
+    if not is_postgres(engine):
+        return
+    with engine.begin() as conn:
+        if not _is_partitioned(conn):
+            print(f"Table '{expense_table.name}' is not partitioned; run migrate_partitions.py to partition it")
+            return
+        create_partitions(conn, months_ahead)
+
+
+# Archive tier: months older than a cutoff are written to compressed files and dropped
+def archive_path(archive_dir: str, period, fmt: str):
+    extension = "parquet" if fmt == "parquet" else "csv.gz"
+    return os.path.join(archive_dir, f"{period_table_name(period)}.{extension}")
+
+def _write_archive(path: str, rows, fmt: str):
+    if fmt == "parquet":
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise RuntimeError("Parquet archives require pyarrow; install it or use --format csv")
+        pq.write_table(pa.Table.from_pylist(rows), path, compression="zstd")
+        return
+    with gzip.open(path, "wt", newline="") as archive:
+        writer = csv.DictWriter(archive, fieldnames=COLUMNS)
+        writer.writeheader()
+        for row in rows:
+            writer.writerow({**row, "date": row["date"].isoformat()})
+
+def _read_archive(path: str):
+    if path.endswith(".parquet"):
+        import pyarrow.parquet as pq
+        return [_upgrade_row(row) for row in pq.read_table(path).to_pylist()]
+    with gzip.open(path, "rt", newline="") as archive:
+        return [
+            _upgrade_row({
+                "id": int(row["id"]),
+                "owner_id": int(row["owner_id"]) if row.get("owner_id") else None,
+                "title": row["title"],
+                "amount_minor": int(row["amount_minor"]) if "amount_minor" in row else None,
+                "amount": row.get("amount"),
+                "date": datetime.fromisoformat(row["date"]),
+                "notes": row["notes"] or None,
+                "category_id": int(row["category_id"]) if row["category_id"] else None,
+                "recurring_id": int(row["recurring_id"]) if row.get("recurring_id") else None,
+            })
+            for row in csv.DictReader(archive)
+        ]
+
+def _upgrade_row(row):
+    # Older archives carry a float `amount`, no owner and no recurring_id
+    row.setdefault("recurring_id", None)
+    if row.get("owner_id") is None:
+        row["owner_id"] = models.DEFAULT_OWNER_ID
+    amount = row.pop("amount", None)
+    if row.get("amount_minor") is None:
+        row["amount_minor"] = money.to_minor(amount or 0)
+    return row
+
+def _archive_periods(conn, before):
+    # Periods older than `before` that still have rows (SQLite) or a partition (PostgreSQL)
+    if conn.dialect.name == "postgresql":
+        return [period for period in list_partitions(conn) if period < before]
+    dates = select(expense_table.c.date).where(expense_table.c.date < period_bounds(before)[0]).distinct()
+    return sorted({period_of(value) for value in conn.execute(dates).scalars()})
+
+def archive_partitions(engine, before, archive_dir: str = ARCHIVE_DIR, fmt: str = "csv"):
+    """Archive every period older than the `before` period; returns the archived files."""
+    if needs_partition_migration(engine):
+        raise RuntimeError(f"Table '{expense_table.name}' is not partitioned; run migrate_partitions.py first")
+    os.makedirs(archive_dir, exist_ok=True)
+    # Archives are written to temporary files and only moved into place once the rows are
+    # dropped, so a failure leaves neither half-archived periods nor duplicate files behind
+    pending = []
+    try:
+        with engine.begin() as conn:
+            if is_postgres(engine):
+                _split_default_partition(conn)
+            for period in _archive_periods(conn, before):
+                if is_postgres(engine):
+                    # The detached partition is read whole and then dropped
+                    name = period_table_name(period)
+                    conn.execute(text(f"ALTER TABLE {expense_table.name} DETACH PARTITION {name}"))
+                    table = _period_table(name)
+                    query = select(table)
+                else:
+                    start, end = period_bounds(period)
+                    table = expense_table
+                    query = select(table).where(table.c.date >= start, table.c.date < end)
+                rows = [dict(row) for row in conn.execute(query.order_by(table.c.date)).mappings()]
+                path = archive_path(archive_dir, period, fmt)
+                if os.path.exists(path):
+                    # Late rows for an already archived period are merged into the existing
+                    # file; a row already in it is replaced rather than archived twice
+                    merged = {row["id"]: row for row in _read_archive(path) + rows}
+                    rows = sorted(merged.values(), key=lambda row: row["date"])
+                temp_path = f"{path}.tmp"
+                pending.append((temp_path, path))
+                _write_archive(temp_path, rows, fmt)
+                if is_postgres(engine):
+                    conn.execute(text(f"DROP TABLE {table.name}"))
+                else:
+                    conn.execute(table.delete().where(table.c.date >= start, table.c.date < end))
+    except BaseException:
+        for temp_path, _ in pending:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+        raise
+    for temp_path, path in pending:
+        os.replace(temp_path, path)
+    return [path for _, path in pending]
+
+
+def export_expenses(engine, start: datetime, end: datetime, archive_dir: str = ARCHIVE_DIR, owner_id=None):
+    """Yield expenses dated in [start, end), archived rows first, then live ones.
+
+    Pass `owner_id` to only export one owner's expenses.
+    """
+    period = period_of(start)
+    while period_bounds(period)[0] < end:
+        for fmt in ("parquet", "csv"):
+            path = archive_path(archive_dir, period, fmt)
+            if os.path.exists(path):
+                for row in _read_archive(path):
+                    if start <= row["date"] < end and owner_id in (None, row["owner_id"]):
+                        yield row
+        period = add_months(period, 1)
+
+    query = (
+        select(expense_table)
+        .where(expense_table.c.date >= start, expense_table.c.date < end)
+        .order_by(expense_table.c.date)
+    )
+    if owner_id is not None:
+        query = query.where(expense_table.c.owner_id == owner_id)
+    with engine.connect() as conn:
+        for row in conn.execute(query).mappings():
+            yield dict(row)
@@ -0,0 +1,191 @@
+import heapq
+from calendar import monthrange
+from datetime import datetime, timedelta
+from typing import Optional
+
+from sqlalchemy import insert, or_, update
+from sqlalchemy.orm import Session
+
+import models, money
+
+# Length of one period for each frequency, in days or months
+FREQUENCIES = {
+    "daily": ("days", 1),
+    "weekly": ("days", 7),
+    "monthly": ("months", 1),
+    "yearly": ("months", 12),
+}
+
+# Number of occurrences inserted per transaction when materializing
+BATCH_SIZE = 500
+
+# Occurrence arithmetic. Occurrences are numbered from 0 at the rule's start date, so
+# finding the ones in a range or counting them never walks the rule's whole history.
+def _step(rule):
+    unit, length = FREQUENCIES[rule.frequency]
+    return unit, length * (rule.interval or 1)
+
+def occurrence_at(rule, index: int) -> datetime:
+    unit, step = _step(rule)
+    start = rule.start_date
+    if unit == "days":
+        return start + timedelta(days=step * index)
+    month = start.month - 1 + step * index
+    year, month = start.year + month // 12, month % 12 + 1
+    # "Monthly on the 31st" falls on the last day of shorter months
+    return start.replace(year=year, month=month, day=min(start.day, monthrange(year, month)[1]))
+
+def first_index_from(rule, moment: datetime) -> int:
+    """Index of the first occurrence at or after `moment`."""
+    start = rule.start_date
+    if moment <= start:
+        return 0
+    unit, step = _step(rule)
+    if unit == "days":
+        return -(-(moment - start) // timedelta(days=step))
+    index = ((moment.year - start.year) * 12 + moment.month - start.month) // step
+    while occurrence_at(rule, index) < moment:
+        index += 1
+    return index
+
+def _bounds(rule, start: Optional[datetime], end: datetime, include_materialized: bool = False):
+    # Index range [first, last) of the rule's occurrences within [start, end)
+    lower = rule.start_date if start is None else max(start, rule.start_date)
+    if not include_materialized and rule.materialized_until is not None:
+        lower = max(lower, rule.materialized_until)
+    upper = end
+    if rule.end_date is not None:
+        upper = min(upper, rule.end_date + timedelta(microseconds=1))
+    first = first_index_from(rule, lower)
+    return first, max(first, first_index_from(rule, upper))
+
+def occurrences(rule, start: Optional[datetime], end: datetime):
+    """Lazily yield the dates of occurrences in [start, end) that aren't materialized yet."""
+    first, last = _bounds(rule, start, end)
+    for index in range(first, last):
+        yield occurrence_at(rule, index)
+
+def count_occurrences(rule, start: Optional[datetime], end: datetime) -> int:
+    first, last = _bounds(rule, start, end)
+    return last - first
+
+
+class ProjectedExpense:
+    """An occurrence of a recurring expense that hasn't been inserted as an expense yet."""
+    id = None
+    projected = True
+
+    def __init__(self, rule, date: datetime):
+        self.recurring_id = rule.id
+        self.owner_id = rule.owner_id
+        self.title = rule.title
+        self.amount_minor = rule.amount_minor
+        self.amount = money.from_minor(rule.amount_minor)
+        self.notes = rule.notes
+        self.category_id = rule.category_id
+        self.category = rule.category
+        self.date = date
+
+
+def get_active_rules(db: Session, owner_id: int, start: Optional[datetime], end: datetime):
+    # Rules that can have occurrences in [start, end)
+    query = db.query(models.RecurringExpense).filter(
+        models.RecurringExpense.owner_id == owner_id,
+        models.RecurringExpense.start_date < end,
+    )
+    if start is not None:
+        query = query.filter(or_(
+            models.RecurringExpense.end_date.is_(None),
+            models.RecurringExpense.end_date >= start,
+        ))
+    return query.all()
+
+def _projected(rule, start: Optional[datetime], end: datetime):
+    for date in occurrences(rule, start, end):
+        yield ProjectedExpense(rule, date)
+
+def project(db: Session, owner_id: int, start: Optional[datetime], end: datetime):
+    """Yield projected expenses in [start, end) for all of the owner's rules, ordered by date."""
+    streams = [_projected(rule, start, end) for rule in get_active_rules(db, owner_id, start, end)]
+    return heapq.merge(*streams, key=lambda expense: expense.date)
+
+def projected_totals(db: Session, owner_id: int, start: Optional[datetime], end: datetime):
+    """Map category_id to (count, total_minor) of projected occurrences, without generating them."""
+    totals = {}
+    for rule in get_active_rules(db, owner_id, start, end):
+        count = count_occurrences(rule, start, end)
+        if count:
+            previous_count, previous_total = totals.get(rule.category_id, (0, 0))
+            totals[rule.category_id] = (previous_count + count, previous_total + count * rule.amount_minor)
+    return totals
+
+
+def materialize(db: Session, upto: Optional[datetime] = None, batch_size: int = BATCH_SIZE) -> int:
+    """
+    Insert every occurrence before `upto` (default: now) as an expense, in batches.
+
+    Each batch advances the rule's `materialized_until` with a compare-and-set in the
+    same transaction as its inserts, so concurrent schedulers never insert twice.
+    Returns the number of expenses inserted.
+    """
+    upto = upto or datetime.now()
+    rule_ids = [
+        rule_id for (rule_id,) in db.query(models.RecurringExpense.id).filter(
+            models.RecurringExpense.start_date < upto,
+            or_(
+                models.RecurringExpense.materialized_until.is_(None),
+                models.RecurringExpense.materialized_until < upto,
+            ),
+            # Rules that ended before their watermark have nothing left to insert
+            or_(
+                models.RecurringExpense.end_date.is_(None),
+                models.RecurringExpense.materialized_until.is_(None),
+                models.RecurringExpense.end_date >= models.RecurringExpense.materialized_until,
+            ),
+        )
+    ]
+    inserted = 0
+    for rule_id in rule_ids:
+        while True:
+            rule = db.get(models.RecurringExpense, rule_id)
+            if rule is None:
+                break
+            first, last = _bounds(rule, None, upto)
+            end = min(last, first + batch_size)
+            watermark = occurrence_at(rule, end) if end < last else upto
+            if rule.materialized_until is not None and watermark <= rule.materialized_until:
+                break
+
+            claimed = db.execute(
+                update(models.RecurringExpense)
+                .where(
+                    models.RecurringExpense.id == rule.id,
+                    models.RecurringExpense.materialized_until.is_(None) if rule.materialized_until is None
+                    else models.RecurringExpense.materialized_until == rule.materialized_until,
+                )
+                .values(materialized_until=watermark)
+                .execution_options(synchronize_session=False)
+            ).rowcount
+            if not claimed:
+                # Another scheduler got there first
+                db.rollback()
+                break
+            if end > first:
+                db.execute(insert(models.Expense.__table__), [
+                    {
+                        "owner_id": rule.owner_id,
+                        "title": rule.title,
+                        "amount_minor": rule.amount_minor,
+                        "date": occurrence_at(rule, index),
+                        "notes": rule.notes,
+                        "category_id": rule.category_id,
+                        "recurring_id": rule.id,
+                    }
+                    for index in range(first, end)
+                ])
+            db.commit()
+            inserted += end - first
+            db.expire_all()
+            if end >= last:
+                break
+    return inserted
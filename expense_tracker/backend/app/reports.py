@@ -0,0 +1,53 @@
+import money
+
+# In-process reports over many rows (e.g. exports that span the archive) are summed
+# with NumPy over int64 minor units; numpy is imported on first use to keep startup lean.
+
+# Stands in for a missing (NULL) category_id in the int64 arrays; the largest int64 sorts
+# uncategorized expenses last, as in the API summary
+UNCATEGORIZED = 2 ** 63 - 1
+
+def summarize(rows):
+    """Total `amount_minor` per category for an iterable of expense rows (dicts)."""
+    import numpy as np
+
+    amounts = []
+    category_ids = []
+    for row in rows:
+        amounts.append(row["amount_minor"])
+        category_id = row["category_id"]
+        category_ids.append(UNCATEGORIZED if category_id is None else category_id)
+    return summarize_arrays(
+        np.asarray(amounts, dtype=np.int64),
+        np.asarray(category_ids, dtype=np.int64),
+    )
+
+def summarize_arrays(amounts_minor, category_ids):
+    """
+    Vectorized per-category totals; both arguments are equal-length int64 arrays, with
+    UNCATEGORIZED for expenses without a category (reported as category_id None).
+    """
+    import numpy as np
+
+    if len(amounts_minor) == 0:
+        return {"total": money.from_minor(0), "total_minor": 0, "count": 0, "by_category": []}
+
+    # Sort by category once, then reduce each contiguous run with integer adds
+    order = np.argsort(category_ids, kind="stable")
+    sorted_categories = category_ids[order]
+    starts = np.concatenate(([0], np.flatnonzero(np.diff(sorted_categories)) + 1))
+    totals = np.add.reduceat(amounts_minor[order], starts)
+    counts = np.diff(np.append(starts, len(sorted_categories)))
+
+    by_category = [
+        {"category_id": None if category_id == UNCATEGORIZED else int(category_id), "total": money.from_minor(int(total)),
+         "total_minor": int(total), "count": int(count)}
+        for category_id, total, count in zip(sorted_categories[starts], totals, counts)
+    ]
+    total_minor = int(amounts_minor.sum())
+    return {
+        "total": money.from_minor(total_minor),
+        "total_minor": total_minor,
+        "count": len(amounts_minor),
+        "by_category": by_category,
+    }
@@ -1,6 +1,9 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field, validator
 from typing import Optional, List
 from datetime import datetime
+from decimal import Decimal
+
+from money import MAX_AMOUNT
 
 # Category schemas
 class CategoryBase(BaseModel):
@@ -18,7 +21,7 @@ class Category(CategoryBase):
 # Expense schemas
 class ExpenseBase(BaseModel):
     title: str
-    amount: float
+    amount: Decimal = Field(..., ge=-MAX_AMOUNT, le=MAX_AMOUNT)
     notes: Optional[str] = None
     category_id: int
 
@@ -27,15 +30,64 @@ class ExpenseCreate(ExpenseBase):
 
 class ExpenseUpdate(BaseModel):
     title: Optional[str] = None
-    amount: Optional[float] = None
+    amount: Optional[Decimal] = Field(None, ge=-MAX_AMOUNT, le=MAX_AMOUNT)
     notes: Optional[str] = None
     category_id: Optional[int] = None
     date: Optional[datetime] = None
 
 class Expense(ExpenseBase):
-    id: int
+    # Projected occurrences of a recurring expense have no id until they're materialized
+    id: Optional[int]
+    # The input bound isn't applied to stored amounts
+    amount: Decimal
     date: datetime
     category: Category
+    recurring_id: Optional[int] = None
+    projected: bool = False
+
+    class Config:
+        orm_mode = True
+
+# Summary schemas
+class CategoryTotal(BaseModel):
+    # None for expenses without a category
+    category_id: Optional[int]
+    total: Decimal
+    total_minor: int
+    count: int
+
+class ExpenseSummary(BaseModel):
+    total: Decimal
+    total_minor: int
+    count: int
+    projected_count: int = 0
+    by_category: List[CategoryTotal]
+
+# Recurring expense schemas
+class RecurringExpenseBase(BaseModel):
+    title: str
+    amount: Decimal = Field(..., ge=-MAX_AMOUNT, le=MAX_AMOUNT)
+    notes: Optional[str] = None
+    category_id: int
+    frequency: str = Field(..., regex="^(daily|weekly|monthly|yearly)$")
+    interval: int = Field(1, ge=1)
+    start_date: datetime
+    end_date: Optional[datetime] = None
+
+    @validator('end_date')
+    def end_date_must_be_after_start_date(cls, v, values):
+        if v is not None and 'start_date' in values and v < values['start_date']:
+            raise ValueError('end_date must be after start_date')
+        return v
+
+class RecurringExpenseCreate(RecurringExpenseBase):
+    pass
+
+class RecurringExpense(RecurringExpenseBase):
+    id: int
+    amount: Decimal
+    materialized_until: Optional[datetime] = None
+    category: Category
 
     class Config:
         orm_mode = True
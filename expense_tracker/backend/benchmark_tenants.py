@@ -0,0 +1,118 @@
+"""
+Per-tenant query latency benchmark.
+
+Seeds the expenses table in stages up to 10k tenants and, after each stage, times
+the owner-scoped queries the API runs (a page of expenses and the summary) for
+randomly chosen tenants. With the (owner_id, date) index the latency should stay
+flat while the total table size grows.
+
+Always runs against a throwaway SQLite database, which is deleted afterwards, even
+when DATABASE_URL is set. To benchmark another database, opt in explicitly; the
+benchmark then adds its tenants after the existing owners and leaves them in place:
+    python benchmark_tenants.py [--tenants 10000] [--expenses-per-tenant 20] [--stages 4]
+                                [--database-url postgresql://localhost/expense_benchmark]
+"""
+import sys
+import os
+import argparse
+import random
+import shutil
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'app'))
+
+def seed(first_owner: int, last_owner: int, expenses_per_tenant: int, rng: random.Random):
+    # Bulk insert with Core; each tenant gets one category and a spread of dated expenses.
+    # Category ids are assigned by the database, so existing rows are never touched.
+    from sqlalchemy import insert, select
+    from database import engine
+    import models
+    now = datetime.now()
+    with engine.begin() as conn:
+        conn.execute(insert(models.Category), [
+            {"owner_id": owner_id, "name": "General"}
+            for owner_id in range(first_owner, last_owner)
+        ])
+        category_ids = dict(conn.execute(
+            select(models.Category.owner_id, models.Category.id)
+            .where(models.Category.owner_id >= first_owner, models.Category.owner_id < last_owner)
+        ).all())
+        conn.execute(insert(models.Expense), [
+            {
+                "owner_id": owner_id,
+                "title": f"Expense {n}",
+                "amount_minor": rng.randint(100, 50000),
+                "date": now - timedelta(days=rng.randint(0, 90)),
+                "category_id": category_ids[owner_id],
+            }
+            for owner_id in range(first_owner, last_owner)
+            for n in range(expenses_per_tenant)
+        ])
+
+def time_queries(first_owner: int, last_owner: int, samples: int, rng: random.Random):
+    from database import SessionLocal
+    import crud
+    timings = {"list": [], "summary": []}
+    db = SessionLocal()
+    try:
+        for _ in range(samples):
+            owner_id = rng.randint(first_owner, last_owner)
+            start = time.perf_counter()
+            crud.get_expenses(db, owner_id=owner_id)
+            timings["list"].append(time.perf_counter() - start)
+            start = time.perf_counter()
+            crud.get_expense_summary(db, owner_id=owner_id)
+            timings["summary"].append(time.perf_counter() - start)
+            db.expunge_all()
+    finally:
+        db.close()
+    return {name: statistics.median(values) * 1000 for name, values in timings.items()}
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark per-tenant query latency")
+    parser.add_argument("--tenants", type=int, default=10000)
+    parser.add_argument("--expenses-per-tenant", type=int, default=20)
+    parser.add_argument("--stages", type=int, default=4)
+    parser.add_argument("--samples", type=int, default=200)
+    parser.add_argument("--database-url", help="Benchmark this database instead of a throwaway SQLite one")
+    args = parser.parse_args()
+
+    # DATABASE_URL from the environment or .env is deliberately ignored unless opted into
+    workdir = None
+    if args.database_url:
+        os.environ["DATABASE_URL"] = args.database_url
+    else:
+        workdir = tempfile.mkdtemp()
+        os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(workdir, 'benchmark.db')}"
+
+    from sqlalchemy import func
+    from database import SessionLocal, engine
+    import models, partitions
+    try:
+        models.Base.metadata.create_all(bind=engine)
+        partitions.ensure_partitions(engine)
+        rng = random.Random(42)
+
+        # Benchmark tenants come after any owners already in the database
+        with SessionLocal() as db:
+            first_owner = (db.query(func.max(models.Category.owner_id)).scalar() or 0) + 1
+
+        print(f"{'tenants':>10} {'rows':>10} {'list p50 (ms)':>15} {'summary p50 (ms)':>18}")
+        seeded = 0
+        for stage in range(1, args.stages + 1):
+            target = args.tenants * stage // args.stages
+            seed(first_owner + seeded, first_owner + target, args.expenses_per_tenant, rng)
+            seeded = target
+            latency = time_queries(first_owner, first_owner + seeded - 1, args.samples, rng)
+            rows = seeded * args.expenses_per_tenant
+            print(f"{seeded:>10} {rows:>10} {latency['list']:>15.3f} {latency['summary']:>18.3f}")
+    finally:
+        engine.dispose()
+        if workdir is not None:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
@@ -6,7 +6,7 @@ sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'app'))
 from app.database import SessionLocal, engine
 import models, schemas, crud
 
-def init_db():
+def init_db(owner_id=models.DEFAULT_OWNER_ID):
     db = SessionLocal()
     
     # Create default categories
@@ -26,14 +26,15 @@ def init_db():
     ]
     
     for category_name in default_categories:
-        existing_category = crud.get_category_by_name(db, category_name)
+        existing_category = crud.get_category_by_name(db, owner_id, category_name)
         if not existing_category:
             category = schemas.CategoryCreate(name=category_name)
-            crud.create_category(db, category)
+            crud.create_category(db, owner_id, category)
     
     print("Database initialized with default categories!")
     db.close()
 
 if __name__ == "__main__":
     models.Base.metadata.create_all(bind=engine)
-    init_db()
+    # Optionally seed the default categories for a specific owner: python init_db.py <owner_id>
+    init_db(int(sys.argv[1]) if len(sys.argv) > 1 else models.DEFAULT_OWNER_ID)
@@ -0,0 +1,24 @@
+import sys
+import os
+import argparse
+from datetime import timedelta
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'app'))
+
+import auth
+
+# Issues a bearer token for an owner, signed with JWT_SECRET_KEY. The API has no login of
+# its own; use this for development or wherever tokens are handed out to clients.
+#   python issue_token.py <owner_id> [--expires-minutes 1440]
+def main():
+    parser = argparse.ArgumentParser(description="Issue an access token for an owner")
+    parser.add_argument("owner_id", type=int)
+    parser.add_argument("--expires-minutes", type=int, default=auth.ACCESS_TOKEN_EXPIRE_MINUTES)
+    args = parser.parse_args()
+
+    if not auth.auth_enabled():
+        sys.exit("JWT_SECRET_KEY is not set; the API is running in single-owner mode")
+    print(auth.create_access_token(args.owner_id, timedelta(minutes=args.expires_minutes)))
+
+if __name__ == "__main__":
+    main()
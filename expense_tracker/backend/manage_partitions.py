@@ -0,0 +1,88 @@
+import sys
+import os
+import argparse
+import csv
+from datetime import datetime
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'app'))
+
+from database import engine
+import models, partitions, reports
+
+def parse_month(value):
+    # "2024-01" -> (2024, 1)
+    return partitions.period_of(datetime.strptime(value, "%Y-%m"))
+
+def require_partitioned():
+    # Without this, an unpartitioned PostgreSQL table would look like there was nothing to do
+    if partitions.needs_partition_migration(engine):
+        sys.exit("The expenses table is not partitioned; run 'python migrate_partitions.py' first")
+
+def maintain(args):
+    require_partitioned()
+    partitions.ensure_partitions(engine, months_ahead=args.months_ahead)
+    print("Partitions are up to date!")
+
+def archive(args):
+    require_partitioned()
+    before = parse_month(args.before)
+    archived = partitions.archive_partitions(engine, before, archive_dir=args.archive_dir, fmt=args.format)
+    for path in archived:
+        print(f"Archived {path}")
+    print(f"Archived {len(archived)} partition(s) older than {args.before}")
+
+def export(args):
+    start = datetime.strptime(args.start, "%Y-%m-%d")
+    end = datetime.strptime(args.end, "%Y-%m-%d")
+    with open(args.output, "w", newline="") as output:
+        writer = csv.DictWriter(output, fieldnames=partitions.COLUMNS)
+        writer.writeheader()
+        count = 0
+        for row in partitions.export_expenses(engine, start, end, archive_dir=args.archive_dir,
+                                              owner_id=args.owner_id):
+            writer.writerow(row)
+            count += 1
+    print(f"Exported {count} expense(s) to {args.output}")
+
+def report(args):
+    start = datetime.strptime(args.start, "%Y-%m-%d")
+    end = datetime.strptime(args.end, "%Y-%m-%d")
+    rows = partitions.export_expenses(engine, start, end, archive_dir=args.archive_dir, owner_id=args.owner_id)
+    summary = reports.summarize(rows)
+    for category in summary["by_category"]:
+        name = "Uncategorized" if category["category_id"] is None else f"Category {category['category_id']}"
+        print(f"{name}: {category['total']} ({category['count']} expense(s))")
+    print(f"Total: {summary['total']} ({summary['count']} expense(s))")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Manage expense partitions and the archive tier")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    maintain_parser = subparsers.add_parser("maintain", help="Create upcoming partitions and move rows into their partition")
+    maintain_parser.add_argument("--months-ahead", type=int, default=partitions.PARTITIONS_AHEAD)
+    maintain_parser.set_defaults(func=maintain)
+
+    archive_parser = subparsers.add_parser("archive", help="Move partitions older than a month to compressed files")
+    archive_parser.add_argument("--before", required=True, help="First month to keep in the database (YYYY-MM)")
+    archive_parser.add_argument("--format", choices=["csv", "parquet"], default="csv")
+    archive_parser.add_argument("--archive-dir", default=partitions.ARCHIVE_DIR)
+    archive_parser.set_defaults(func=archive)
+
+    export_parser = subparsers.add_parser("export", help="Export expenses from the database and the archive to CSV")
+    export_parser.add_argument("--start", required=True, help="Start date, inclusive (YYYY-MM-DD)")
+    export_parser.add_argument("--end", required=True, help="End date, exclusive (YYYY-MM-DD)")
+    export_parser.add_argument("--output", default="expenses_export.csv")
+    export_parser.add_argument("--archive-dir", default=partitions.ARCHIVE_DIR)
+    export_parser.add_argument("--owner-id", type=int, help="Only export this owner's expenses")
+    export_parser.set_defaults(func=export)
+
+    report_parser = subparsers.add_parser("report", help="Total expenses per category across the database and the archive")
+    report_parser.add_argument("--start", required=True, help="Start date, inclusive (YYYY-MM-DD)")
+    report_parser.add_argument("--end", required=True, help="End date, exclusive (YYYY-MM-DD)")
+    report_parser.add_argument("--archive-dir", default=partitions.ARCHIVE_DIR)
+    report_parser.add_argument("--owner-id", type=int, help="Only report on this owner's expenses")
+    report_parser.set_defaults(func=report)
+
+    args = parser.parse_args()
+    models.Base.metadata.create_all(bind=engine)
+    args.func(args)
@@ -0,0 +1,30 @@
+import sys
+import os
+import argparse
+from datetime import datetime
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'app'))
+
+from database import SessionLocal, engine
+import models, recurrence
+
+# Inserts due recurring expense occurrences as regular expenses. Safe to run from cron
+# alongside the API's own background materializer; each occurrence is inserted once.
+#   python materialize_recurring.py [--upto 2024-06-30] [--batch-size 500]
+def main():
+    parser = argparse.ArgumentParser(description="Materialize due recurring expenses")
+    parser.add_argument("--upto", type=datetime.fromisoformat, default=None,
+                        help="Materialize occurrences before this date (default: now)")
+    parser.add_argument("--batch-size", type=int, default=recurrence.BATCH_SIZE)
+    args = parser.parse_args()
+
+    models.Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        inserted = recurrence.materialize(db, upto=args.upto, batch_size=args.batch_size)
+    finally:
+        db.close()
+    print(f"Materialized {inserted} recurring expenses")
+
+if __name__ == "__main__":
+    main()
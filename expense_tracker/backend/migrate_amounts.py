@@ -0,0 +1,35 @@
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'app'))
+
+from sqlalchemy import inspect, text
+
+from database import engine
+import money, partitions
+
+# One-off migration of the float `amount` column to integer minor units (`amount_minor`)
+def migrate_amounts():
+    with engine.begin() as conn:
+        # On PostgreSQL, altering the partitioned parent table carries over to every partition
+        tables = ["expenses"]
+        if partitions.is_postgres(engine):
+            to_minor = f"ROUND(CAST(amount AS NUMERIC) * {money.MINOR_UNITS})"
+        else:
+            to_minor = f"ROUND(amount * {money.MINOR_UNITS})"
+
+        inspector = inspect(conn)
+        for table in tables:
+            columns = {column["name"] for column in inspector.get_columns(table)}
+            if "amount" not in columns:
+                print(f"{table} is already migrated")
+                continue
+            conn.execute(text(f"ALTER TABLE {table} ADD COLUMN amount_minor BIGINT NOT NULL DEFAULT 0"))
+            conn.execute(text(f"UPDATE {table} SET amount_minor = CAST(COALESCE({to_minor}, 0) AS BIGINT)"))
+            conn.execute(text(f"ALTER TABLE {table} DROP COLUMN amount"))
+            if partitions.is_postgres(engine):
+                conn.execute(text(f"ALTER TABLE {table} ALTER COLUMN amount_minor DROP DEFAULT"))
+            print(f"Migrated {table}")
+
+if __name__ == "__main__":
+    migrate_amounts()
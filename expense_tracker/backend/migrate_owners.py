@@ -0,0 +1,43 @@
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'app'))
+
+from sqlalchemy import inspect, text
+
+from database import engine
+import models, partitions
+
+# One-off migration adding `owner_id` to categories and expenses. Existing rows are
+# assigned to the default owner.
+def migrate_owners():
+    with engine.begin() as conn:
+        tables = ["categories", "expenses"]
+
+        inspector = inspect(conn)
+        for table in tables:
+            columns = {column["name"] for column in inspector.get_columns(table)}
+            if "owner_id" in columns:
+                print(f"{table} is already migrated")
+                continue
+            conn.execute(text(
+                f"ALTER TABLE {table} ADD COLUMN owner_id INTEGER NOT NULL DEFAULT {models.DEFAULT_OWNER_ID}"
+            ))
+            print(f"Migrated {table}")
+
+        # Category names are now unique per owner instead of globally
+        conn.execute(text("DROP INDEX IF EXISTS ix_categories_name"))
+        conn.execute(text("CREATE INDEX ix_categories_name ON categories (name)"))
+        if "uq_categories_owner_name" not in {c["name"] for c in inspector.get_unique_constraints("categories")}:
+            if partitions.is_postgres(engine):
+                conn.execute(text(
+                    "ALTER TABLE categories ADD CONSTRAINT uq_categories_owner_name UNIQUE (owner_id, name)"
+                ))
+            else:
+                conn.execute(text(
+                    "CREATE UNIQUE INDEX IF NOT EXISTS uq_categories_owner_name ON categories (owner_id, name)"
+                ))
+        conn.execute(text("CREATE INDEX IF NOT EXISTS ix_expenses_owner_date ON expenses (owner_id, date)"))
+
+if __name__ == "__main__":
+    migrate_owners()
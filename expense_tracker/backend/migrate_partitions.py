@@ -0,0 +1,50 @@
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'app'))
+
+from sqlalchemy import text
+
+from database import engine
+import partitions
+
+# One-off migration of an unpartitioned PostgreSQL `expenses` table to monthly partitions.
+# The old table is renamed, the partitioned one is created in its place and every row is
+# copied across, all in one transaction. Run migrate_amounts.py, migrate_owners.py and
+# migrate_recurring.py first if the table predates those columns.
+def migrate_partitions():
+    if not partitions.is_postgres(engine):
+        print("Expenses are only partitioned on PostgreSQL; nothing to migrate")
+        return
+    if not partitions.needs_partition_migration(engine):
+        print("expenses is already partitioned")
+        return
+
+    table = partitions.expense_table
+    old = f"{table.name}_unpartitioned"
+    with engine.begin() as conn:
+        conn.execute(text(f"ALTER TABLE {table.name} RENAME TO {old}"))
+        # Index and sequence names stay with the renamed table; free them for the new one
+        indexes = conn.execute(text("SELECT indexname FROM pg_indexes WHERE tablename = :name"), {"name": old}).scalars()
+        for index in list(indexes):
+            conn.execute(text(f"ALTER INDEX {index} RENAME TO {index}_unpartitioned"))
+        sequence = conn.execute(text("SELECT pg_get_serial_sequence(:name, 'id')"), {"name": old}).scalar()
+        if sequence is not None:
+            conn.execute(text(f"ALTER SEQUENCE {sequence} RENAME TO {old}_id_seq"))
+
+        table.create(conn)
+        partitions.create_partitions(conn)
+        columns = ", ".join(partitions.COLUMNS)
+        conn.execute(text(f"INSERT INTO {table.name} ({columns}) SELECT {columns} FROM {old}"))
+        # Rows outside the partitions created so far landed in the default partition
+        partitions.create_partitions(conn)
+        conn.execute(text(
+            f"SELECT setval(pg_get_serial_sequence('{table.name}', 'id'), COALESCE(MAX(id), 1), MAX(id) IS NOT NULL) "
+            f"FROM {table.name}"
+        ))
+        count = conn.execute(text(f"SELECT COUNT(*) FROM {table.name}")).scalar()
+        conn.execute(text(f"DROP TABLE {old}"))
+    print(f"Moved {count} expense(s) into the partitioned table")
+
+if __name__ == "__main__":
+    migrate_partitions()
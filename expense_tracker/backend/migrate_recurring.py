@@ -0,0 +1,27 @@
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'app'))
+
+from sqlalchemy import inspect, text
+
+from database import engine
+
+# One-off migration adding `recurring_id` to expenses, so materialized occurrences record
+# the recurring expense they came from. Existing rows are left without one.
+def migrate_recurring():
+    with engine.begin() as conn:
+        # On PostgreSQL, altering the partitioned parent table carries over to every partition
+        tables = ["expenses"]
+
+        inspector = inspect(conn)
+        for table in tables:
+            columns = {column["name"] for column in inspector.get_columns(table)}
+            if "recurring_id" in columns:
+                print(f"{table} is already migrated")
+                continue
+            conn.execute(text(f"ALTER TABLE {table} ADD COLUMN recurring_id INTEGER"))
+            print(f"Migrated {table}")
+
+if __name__ == "__main__":
+    migrate_recurring()
@@ -0,0 +1,112 @@
+"""
+Import-time profiler and startup budget check for the Expense Tracker API.
+
+Runs ``python -X importtime -c "import main"`` in a fresh interpreter,
+prints the slowest imports and exits non-zero when the total import time
+goes over budget or when a module that should be loaded lazily shows up.
+
+Usage:
+    python profile_imports.py [--budget-ms 650] [--top 15] [--runs 5]
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+
+# Target module imported by uvicorn on startup
+TARGET = "main"
+
+# Modules that must only be imported on first use, never at startup (reports, parquet archives)
+DEFERRED_MODULES = ["numpy", "pyarrow"]
+
+# Default startup budget in milliseconds (override with --budget-ms or IMPORT_BUDGET_MS),
+# about 1.5x the measured import time with compiled bytecode
+DEFAULT_BUDGET_MS = 650
+
+
+def run_importtime(target: str, cwd: str):
+    """Import the target in a fresh interpreter and return the -X importtime lines"""
+    # main.py creates the tables on import, so point it at a throwaway SQLite file
+    # unless a DATABASE_URL was given explicitly
+    with tempfile.TemporaryDirectory() as workdir:
+        env = dict(os.environ)
+        env.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(workdir, 'profile.db')}")
+        env["PYTHONPATH"] = os.pathsep.join(filter(None, [cwd, env.get("PYTHONPATH")]))
+        result = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", f"import {target}"],
+            cwd=workdir,
+            env=env,
+            capture_output=True,
+            text=True,
+        )
+    if result.returncode != 0:
+        errors = [line for line in result.stderr.splitlines() if not line.startswith("import time:")]
+        sys.stderr.write("\n".join(errors) + "\n")
+        raise SystemExit(f"Importing {target} failed")
+    return [line for line in result.stderr.splitlines() if line.startswith("import time:")]
+
+
+def parse_importtime(lines):
+    """Parse importtime output into (module, self_us, cumulative_us, depth) tuples"""
+    entries = []
+    for line in lines:
+        head, cumulative_us, name = line.split("|", 2)
+        self_us = head.split(":", 1)[1].strip()
+        # Skip the "self [us] | cumulative | imported package" header
+        if not self_us.isdigit():
+            continue
+        name = name[1:]
+        depth = (len(name) - len(name.lstrip(" "))) // 2
+        entries.append((name.strip(), int(self_us), int(cumulative_us), depth))
+    return entries
+
+
+def total_import_us(entries):
+    """Total import time of a run, in microseconds"""
+    return sum(cumulative for _, _, cumulative, depth in entries if depth == 0)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Profile application import time")
+    parser.add_argument(
+        "--budget-ms",
+        type=float,
+        default=float(os.getenv("IMPORT_BUDGET_MS", DEFAULT_BUDGET_MS)),
+        help="Fail when total import time exceeds this many milliseconds",
+    )
+    parser.add_argument("--top", type=int, default=15, help="Number of slowest imports to show")
+    parser.add_argument("--runs", type=int, default=5, help="Import this many times and report the fastest run")
+    args = parser.parse_args()
+
+    app_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "app")
+    # Timings vary a lot between runs on a busy machine; the fastest run is the most repeatable
+    runs = [parse_importtime(run_importtime(TARGET, app_dir)) for _ in range(max(args.runs, 1))]
+    entries = min(runs, key=total_import_us)
+
+    total_ms = total_import_us(entries) / 1000
+    print(f"Total import time for {TARGET}: {total_ms:.1f} ms, fastest of {len(runs)} run(s) (budget {args.budget_ms:.0f} ms)")
+    print(f"\nTop {args.top} imports by self time:")
+    for name, self_us, cumulative_us, _ in sorted(entries, key=lambda e: e[1], reverse=True)[:args.top]:
+        print(f"  {self_us / 1000:8.1f} ms self  {cumulative_us / 1000:8.1f} ms cumulative  {name}")
+
+    failures = []
+    imported = {name for name, _, _, _ in entries}
+    for module in DEFERRED_MODULES:
+        if module in imported:
+            failures.append(f"{module} is imported at startup but should be loaded lazily")
+    if total_ms > args.budget_ms:
+        failures.append(f"import time {total_ms:.1f} ms exceeds budget of {args.budget_ms:.0f} ms")
+
+    if failures:
+        print("\nStartup budget check FAILED:")
+        for failure in failures:
+            print(f"  - {failure}")
+        return 1
+
+    print("\nStartup budget check passed")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
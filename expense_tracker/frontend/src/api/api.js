@@ -10,9 +10,13 @@ const api = axios.create({
 });
 
 // Expense API calls
-export const fetchExpenses = async () => {
+// Without a startDate the API only lists the last few months
+export const fetchExpenses = async ({ startDate, endDate } = {}) => {
   try {
-    const response = await api.get("/expenses/");
+    const params = {};
+    if (startDate) params.start_date = startDate;
+    if (endDate) params.end_date = endDate;
+    const response = await api.get("/expenses/", { params });
     return response.data;
   } catch (error) {
     console.error("Error fetching expenses:", error);
@@ -20,6 +24,20 @@ export const fetchExpenses = async () => {
   }
 };
 
+// Totals over every expense (or a date range), computed by the API
+export const fetchExpenseSummary = async ({ startDate, endDate } = {}) => {
+  try {
+    const params = {};
+    if (startDate) params.start_date = startDate;
+    if (endDate) params.end_date = endDate;
+    const response = await api.get("/expenses/summary", { params });
+    return response.data;
+  } catch (error) {
+    console.error("Error fetching expense summary:", error);
+    throw error;
+  }
+};
+
 export const fetchExpense = async (id) => {
   try {
     const response = await api.get(`/expenses/${id}`);
@@ -1,6 +1,7 @@
 import React, { createContext, useState, useEffect, useContext } from "react";
 import {
   fetchExpenses,
+  fetchExpenseSummary,
   fetchCategories,
   createExpense,
   updateExpense,
@@ -10,6 +11,24 @@ import {
 
 const ExpenseContext = createContext();
 
+// Options for how far back the expense list goes; null lists every expense
+export const LIST_PERIODS = [
+  { months: 6, label: "Last 6 months" },
+  { months: 12, label: "Last 12 months" },
+  { months: null, label: "All time" },
+];
+
+// First day of the month `months - 1` months ago, in the format the API expects
+export const listStartDate = (months) => {
+  if (months === null) {
+    return "1970-01-01T00:00:00";
+  }
+  const now = new Date();
+  const start = new Date(now.getFullYear(), now.getMonth() - (months - 1), 1);
+  const month = String(start.getMonth() + 1).padStart(2, "0");
+  return `${start.getFullYear()}-${month}-01T00:00:00`;
+};
+
 export const useExpenses = () => {
   const context = useContext(ExpenseContext);
   if (!context) {
@@ -20,6 +39,8 @@ export const useExpenses = () => {
 
 export const ExpenseProvider = ({ children }) => {
   const [expenses, setExpenses] = useState([]);
+  const [summary, setSummary] = useState(null);
+  const [listMonths, setListMonths] = useState(LIST_PERIODS[0].months);
   const [categories, setCategories] = useState([]);
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState(null);
@@ -28,12 +49,14 @@ export const ExpenseProvider = ({ children }) => {
     const loadData = async () => {
       try {
         setLoading(true);
-        const [expensesData, categoriesData] = await Promise.all([
-          fetchExpenses(),
+        const [expensesData, summaryData, categoriesData] = await Promise.all([
+          fetchExpenses({ startDate: listStartDate(listMonths) }),
+          fetchExpenseSummary(),
           fetchCategories(),
         ]);
 
         setExpenses(expensesData);
+        setSummary(summaryData);
         setCategories(categoriesData);
         setError(null);
       } catch (err) {
@@ -45,13 +68,23 @@ export const ExpenseProvider = ({ children }) => {
     };
 
     loadData();
-  }, []);
+  }, [listMonths]);
+
+  // Totals cover every expense, not just the listed ones, so they're refetched after changes
+  const refreshSummary = async () => {
+    try {
+      setSummary(await fetchExpenseSummary());
+    } catch (err) {
+      console.error("Error refreshing summary:", err);
+    }
+  };
 
   const addExpense = async (expenseData) => {
     try {
       setLoading(true);
       const newExpense = await createExpense(expenseData);
       setExpenses([...expenses, newExpense]);
+      await refreshSummary();
       return newExpense;
     } catch (err) {
       setError("Failed to add expense. Please try again.");
@@ -70,6 +103,7 @@ export const ExpenseProvider = ({ children }) => {
           expense.id === id ? updatedExpense : expense
         )
       );
+      await refreshSummary();
       return updatedExpense;
     } catch (err) {
       setError("Failed to update expense. Please try again.");
@@ -84,6 +118,7 @@ export const ExpenseProvider = ({ children }) => {
       setLoading(true);
       await deleteExpense(id);
       setExpenses(expenses.filter((expense) => expense.id !== id));
+      await refreshSummary();
     } catch (err) {
       setError("Failed to delete expense. Please try again.");
       throw err;
@@ -106,21 +141,16 @@ export const ExpenseProvider = ({ children }) => {
     }
   };
 
-  // Calculate total expenses
-  const totalExpenses = expenses.reduce(
-    (sum, expense) => sum + expense.amount,
-    0
-  );
+  // Totals across all expenses, from the API summary
+  const totalExpenses = summary ? Number(summary.total) : 0;
+  const totalTransactions = summary ? summary.count : 0;
 
   // Get expenses by category
   const expensesByCategory = categories.map((category) => {
-    const categoryExpenses = expenses.filter(
-      (expense) => expense.category_id === category.id
-    );
-    const total = categoryExpenses.reduce(
-      (sum, expense) => sum + expense.amount,
-      0
-    );
+    const categoryTotal = summary
+      ? summary.by_category.find((item) => item.category_id === category.id)
+      : null;
+    const total = categoryTotal ? Number(categoryTotal.total) : 0;
     return {
       category: category.name,
       total,
@@ -137,7 +167,10 @@ export const ExpenseProvider = ({ children }) => {
     editExpense,
     removeExpense,
     addCategory,
+    listMonths,
+    setListMonths,
     totalExpenses,
+    totalTransactions,
     expensesByCategory,
   };
 
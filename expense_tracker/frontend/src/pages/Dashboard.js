@@ -45,6 +45,7 @@ const Dashboard = () => {
     loading,
     error,
     totalExpenses,
+    totalTransactions,
     expensesByCategory,
   } = useExpenses();
 
@@ -187,7 +188,7 @@ const Dashboard = () => {
                 Total Transactions
               </Typography>
               <Typography variant="h4" component="div" color="primary">
-                {expenses.length}
+                {totalTransactions}
               </Typography>
             </CardContent>
           </Card>
@@ -18,12 +18,17 @@ import {
   Search as SearchIcon,
   Clear as ClearIcon,
 } from "@mui/icons-material";
-import { useExpenses } from "../context/ExpenseContext";
+import {
+  useExpenses,
+  LIST_PERIODS,
+  listStartDate,
+} from "../context/ExpenseContext";
 import ExpenseItem from "../components/ExpenseItem";
 
 const ExpenseList = () => {
   const navigate = useNavigate();
-  const { expenses, categories, loading, error } = useExpenses();
+  const { expenses, categories, loading, error, listMonths, setListMonths } =
+    useExpenses();
   const [searchTerm, setSearchTerm] = useState("");
   const [categoryFilter, setCategoryFilter] = useState("");
   const [sortBy, setSortBy] = useState("date-desc");
@@ -101,7 +106,7 @@ const ExpenseList = () => {
       {/* Filters */}
       <Paper elevation={3} sx={{ p: 3, mb: 3 }}>
         <Grid container spacing={2} alignItems="center">
-          <Grid item xs={12} sm={4}>
+          <Grid item xs={12} sm={3}>
             <TextField
               fullWidth
               label="Search expenses"
@@ -129,7 +134,29 @@ const ExpenseList = () => {
               }}
             />
           </Grid>
-          <Grid item xs={12} sm={4}>
+          <Grid item xs={12} sm={3}>
+            <TextField
+              fullWidth
+              select
+              label="Period"
+              value={listMonths === null ? "all" : listMonths}
+              onChange={(e) =>
+                setListMonths(
+                  e.target.value === "all" ? null : Number(e.target.value)
+                )
+              }
+            >
+              {LIST_PERIODS.map((period) => (
+                <MenuItem
+                  key={period.label}
+                  value={period.months === null ? "all" : period.months}
+                >
+                  {period.label}
+                </MenuItem>
+              ))}
+            </TextField>
+          </Grid>
+          <Grid item xs={12} sm={3}>
             <TextField
               fullWidth
               select
@@ -145,7 +172,7 @@ const ExpenseList = () => {
               ))}
             </TextField>
           </Grid>
-          <Grid item xs={12} sm={4}>
+          <Grid item xs={12} sm={3}>
             <TextField
               fullWidth
               select
@@ -162,6 +189,14 @@ const ExpenseList = () => {
         </Grid>
       </Paper>
 
+      {listMonths !== null && (
+        <Typography variant="body2" color="text.secondary" sx={{ mb: 2 }}>
+          Showing expenses since{" "}
+          {new Date(listStartDate(listMonths)).toLocaleDateString()}. Choose
+          "All time" to see older expenses.
+        </Typography>
+      )}
+
       {/* Expenses List */}
       {sortedExpenses.length > 0 ? (
         <Box>
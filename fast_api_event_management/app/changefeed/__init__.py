@@ -0,0 +1 @@
+# This file makes the changefeed directory a Python package
@@ -0,0 +1,153 @@
+import asyncio
+import json
+from collections import defaultdict, deque
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+# Number of recent changes kept in memory so clients can resume from a sequence number
+HISTORY_SIZE = 1000
+
+# Maximum number of undelivered changes per subscriber before it is disconnected
+QUEUE_SIZE = 256
+
+# Seconds between keepalive comments on an idle stream
+HEARTBEAT_INTERVAL = 15.0
+
+@dataclass
+class Change:
+    """
+    A single create/update/delete or attendee change
+    """
+    seq: int
+    type: str
+    event_id: int
+    data: Dict[str, Any]
+    created_at: datetime = field(default_factory=datetime.utcnow)
+
+    def to_sse(self) -> str:
+        """Format the change as a server-sent event"""
+        payload = {
+            "seq": self.seq,
+            "type": self.type,
+            "event_id": self.event_id,
+            "data": self.data,
+            "created_at": self.created_at.isoformat(),
+        }
+        return f"id: {self.seq}\nevent: {self.type}\ndata: {json.dumps(payload, default=str)}\n\n"
+
+class Subscription:
+    """
+    A subscriber's queue of pending changes, optionally filtered to one event
+    """
+    def __init__(self, event_id: Optional[int] = None):
+        self.event_id = event_id
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=QUEUE_SIZE)
+
+class ChangeBroker:
+    """
+    In-process publish/subscribe broker for event and attendee changes.
+
+    Subscribers are indexed by the event they watch, so publishing only touches
+    subscribers interested in that event (plus those watching every event), and
+    idle subscribers cost nothing but an empty queue.
+    """
+    def __init__(self, history_size: int = HISTORY_SIZE):
+        self.seq = 0
+        self._history: deque = deque(maxlen=history_size)
+        self._subscribers: Dict[Optional[int], Set[Subscription]] = defaultdict(set)
+
+    def publish(self, change_type: str, event_id: int, data: Dict[str, Any]) -> Change:
+        """Record a change and fan it out to matching subscribers"""
+        self.seq += 1
+        change = Change(seq=self.seq, type=change_type, event_id=event_id, data=data)
+        self._history.append(change)
+
+        for subscription in list(self._subscribers.get(event_id, ())) + list(self._subscribers.get(None, ())):
+            try:
+                subscription.queue.put_nowait(change)
+            except asyncio.QueueFull:
+                # A subscriber that can't keep up is dropped; it resumes from its last sequence
+                self._close(subscription)
+        return change
+
+    def subscribe(self, event_id: Optional[int] = None) -> Subscription:
+        """Register a new subscriber, optionally only for changes to one event"""
+        subscription = Subscription(event_id)
+        self._subscribers[event_id].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        """Remove a subscriber"""
+        subscribers = self._subscribers.get(subscription.event_id)
+        if subscribers is not None:
+            subscribers.discard(subscription)
+            if not subscribers:
+                del self._subscribers[subscription.event_id]
+
+    def replay(self, since: int, event_id: Optional[int] = None) -> Tuple[List[Change], bool]:
+        """
+        Return the buffered changes after `since`, and whether the history still
+        reaches back that far (False means the client has to refetch its state)
+        """
+        oldest = self._history[0].seq if self._history else self.seq + 1
+        complete = oldest <= since + 1 and since <= self.seq
+        changes = [
+            change for change in self._history
+            if change.seq > since and (event_id is None or change.event_id == event_id)
+        ]
+        return changes, complete
+
+    def subscriber_count(self) -> int:
+        """Number of connected subscribers"""
+        return sum(len(subscribers) for subscribers in self._subscribers.values())
+
+    def _close(self, subscription: Subscription) -> None:
+        self.unsubscribe(subscription)
+        # Wake the subscriber so it notices it was closed
+        while not subscription.queue.empty():
+            subscription.queue.get_nowait()
+        subscription.queue.put_nowait(None)
+
+# Shared broker for the application process
+broker = ChangeBroker()
+
+async def stream_changes(
+    change_broker: ChangeBroker,
+    event_id: Optional[int] = None,
+    since: Optional[int] = None,
+    heartbeat: float = HEARTBEAT_INTERVAL,
+):
+    """
+    Yield server-sent events for a subscriber, replaying buffered changes after
+    `since` first. If the buffer no longer reaches back to `since`, a `reset`
+    event tells the client to refetch its state before applying live changes.
+    """
+    # Subscribe before replaying so nothing published in between is missed
+    subscription = change_broker.subscribe(event_id)
+    try:
+        yield f"retry: 3000\n: subscribed at {change_broker.seq}\n\n"
+        last_seq = change_broker.seq
+        if since is not None:
+            changes, complete = change_broker.replay(since, event_id)
+            if complete:
+                for change in changes:
+                    yield change.to_sse()
+            else:
+                yield f"id: {last_seq}\nevent: reset\ndata: {json.dumps({'seq': last_seq})}\n\n"
+
+        while True:
+            try:
+                change = await asyncio.wait_for(subscription.queue.get(), timeout=heartbeat)
+            except asyncio.TimeoutError:
+                yield ": keepalive\n\n"
+                continue
+            if change is None:
+                # Dropped for falling behind; the client reconnects with Last-Event-ID
+                break
+            if change.seq <= last_seq:
+                continue
+            last_seq = change.seq
+            yield change.to_sse()
+    finally:
+        change_broker.unsubscribe(subscription)
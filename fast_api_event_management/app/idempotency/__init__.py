@@ -0,0 +1 @@
+# This file makes the idempotency directory a Python package
@@ -0,0 +1,126 @@
+import hashlib
+import re
+from typing import Iterable, Optional, Tuple
+
+from starlette.responses import JSONResponse
+
+from app.idempotency.store import IdempotencyStore
+
+HEADER = b"idempotency-key"
+
+# Longest Idempotency-Key accepted
+MAX_KEY_LENGTH = 255
+
+def compile_route(path: str):
+    """Turn a route path such as /events/{event_id}/attendees into a regex"""
+    return re.compile("^" + re.sub(r"\{[^}]+\}", "[^/]+", path) + "$")
+
+class IdempotencyMiddleware:
+    """
+    Replays the stored response for write requests retried with the same
+    Idempotency-Key header, without running the endpoint again.
+
+    Only the given (method, path) routes are covered. A key is scoped to the
+    method, path and `scope_headers`, and reusing it with a different body is
+    rejected. Server errors aren't stored, so those requests can be retried.
+    """
+    def __init__(self, app, store: IdempotencyStore, routes: Iterable[Tuple[str, str]],
+                 scope_headers: Iterable[str] = ()):
+        self.app = app
+        self.store = store
+        self.routes = [(method.upper(), compile_route(path)) for method, path in routes]
+        self.scope_headers = [header.lower().encode() for header in scope_headers]
+
+    def _covers(self, scope) -> bool:
+        return scope["type"] == "http" and any(
+            scope["method"] == method and pattern.match(scope["path"]) for method, pattern in self.routes
+        )
+
+    async def __call__(self, scope, receive, send):
+        if not self._covers(scope):
+            return await self.app(scope, receive, send)
+        headers = dict(scope["headers"])
+        idempotency_key: Optional[bytes] = headers.get(HEADER)
+        if idempotency_key is None:
+            return await self.app(scope, receive, send)
+        if not idempotency_key or len(idempotency_key) > MAX_KEY_LENGTH:
+            response = JSONResponse(
+                {"detail": f"Idempotency-Key must be 1 to {MAX_KEY_LENGTH} characters"}, status_code=400
+            )
+            return await response(scope, receive, send)
+
+        body = await self._read_body(receive)
+        if body is None:
+            # The client went away mid-request; leave the key free for its retry
+            return
+        key = hashlib.sha256(b"\0".join(
+            [scope["method"].encode(), scope["path"].encode(), idempotency_key]
+            + [headers.get(header, b"") for header in self.scope_headers]
+        )).digest()
+        fingerprint = hashlib.sha256(body).digest()
+
+        # Wait for any in-flight request with the same key, then replay its response
+        while True:
+            stored = self.store.get(key)
+            if stored is not None:
+                if stored.fingerprint != fingerprint:
+                    response = JSONResponse(
+                        {"detail": "Idempotency-Key was already used with a different request"}, status_code=422
+                    )
+                    return await response(scope, receive, send)
+                await send({
+                    "type": "http.response.start",
+                    "status": stored.status,
+                    "headers": stored.headers + [(b"idempotent-replayed", b"true")],
+                })
+                await send({"type": "http.response.body", "body": stored.body})
+                return
+            waiter = self.store.begin(key)
+            if waiter is None:
+                break
+            await waiter.wait()
+
+        response_start = None
+        chunks = []
+        complete = False
+        pending_body = body
+
+        async def replay_receive():
+            # The body was already read to fingerprint it, so hand it over once more
+            nonlocal pending_body
+            if pending_body is not None:
+                message = {"type": "http.request", "body": pending_body, "more_body": False}
+                pending_body = None
+                return message
+            return await receive()
+
+        async def capture_send(message):
+            nonlocal response_start, complete
+            if message["type"] == "http.response.start":
+                response_start = message
+            elif message["type"] == "http.response.body":
+                chunks.append(message.get("body", b""))
+                complete = not message.get("more_body", False)
+            await send(message)
+
+        try:
+            await self.app(scope, replay_receive, capture_send)
+        finally:
+            if complete and response_start["status"] < 500:
+                self.store.finish(key, fingerprint, response_start["status"],
+                                  list(response_start.get("headers", [])), b"".join(chunks))
+            else:
+                self.store.finish(key, fingerprint)
+
+    @staticmethod
+    async def _read_body(receive) -> Optional[bytes]:
+        """Read the whole request body, or return None if the client disconnects first"""
+        chunks = []
+        while True:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                return None
+            chunks.append(message.get("body", b""))
+            if not message.get("more_body", False):
+                break
+        return b"".join(chunks)
@@ -0,0 +1,84 @@
+import asyncio
+import os
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+# Seconds a stored response can be replayed for
+TTL_SECONDS = float(os.getenv("IDEMPOTENCY_TTL", str(24 * 60 * 60)))
+
+# Maximum number of stored responses; the oldest are evicted first
+MAX_ENTRIES = int(os.getenv("IDEMPOTENCY_MAX_KEYS", "10000"))
+
+class StoredResponse:
+    """
+    A completed response, kept so a retried request can be answered without
+    running the endpoint again
+    """
+    __slots__ = ("fingerprint", "status", "headers", "body", "expires_at")
+
+    def __init__(self, fingerprint: bytes, status: int, headers: List[Tuple[bytes, bytes]], body: bytes, expires_at: float):
+        self.fingerprint = fingerprint
+        self.status = status
+        self.headers = headers
+        self.body = body
+        self.expires_at = expires_at
+
+class IdempotencyStore:
+    """
+    In-process store of responses keyed by Idempotency-Key.
+
+    Keys are stored as fixed-size digests and responses as raw bytes. Every entry
+    lives for the same TTL, so insertion order is also expiry order and eviction
+    only ever looks at the oldest entries. Requests still being handled are tracked
+    separately, so concurrent retries wait for the first one instead of running the
+    endpoint again.
+    """
+    def __init__(self, ttl: float = TTL_SECONDS, max_entries: int = MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._responses: "OrderedDict[bytes, StoredResponse]" = OrderedDict()
+        self._in_flight: Dict[bytes, asyncio.Event] = {}
+
+    def get(self, key: bytes) -> Optional[StoredResponse]:
+        """Return the unexpired response stored for a key"""
+        self._evict()
+        return self._responses.get(key)
+
+    def begin(self, key: bytes) -> Optional[asyncio.Event]:
+        """
+        Claim a key for handling. Returns None if the caller now owns the key, or an
+        event that is set once the request currently holding it finishes.
+        """
+        waiter = self._in_flight.get(key)
+        if waiter is None:
+            self._in_flight[key] = asyncio.Event()
+        return waiter
+
+    def finish(self, key: bytes, fingerprint: bytes, status: int = None,
+               headers: List[Tuple[bytes, bytes]] = None, body: bytes = None) -> None:
+        """
+        Release a claimed key, storing its response if one is given. Without a
+        response the key is freed so the next retry runs the endpoint again.
+        """
+        if status is not None:
+            self._responses[key] = StoredResponse(fingerprint, status, headers, body, time.monotonic() + self.ttl)
+            self._responses.move_to_end(key)
+            self._evict()
+        waiter = self._in_flight.pop(key, None)
+        if waiter is not None:
+            waiter.set()
+
+    def __len__(self) -> int:
+        return len(self._responses)
+
+    def _evict(self) -> None:
+        now = time.monotonic()
+        while self._responses:
+            oldest = next(iter(self._responses.values()))
+            if oldest.expires_at > now and len(self._responses) <= self.max_entries:
+                break
+            self._responses.popitem(last=False)
+
+# Shared store for the application process
+store = IdempotencyStore()
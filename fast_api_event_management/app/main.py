@@ -3,6 +3,8 @@ from fastapi.middleware.cors import CORSMiddleware
 from app.routers import users, events
 from app.database.database import engine
 from app.models import user, event
+from app.idempotency.middleware import IdempotencyMiddleware
+from app.idempotency.store import store
 
 # Create database tables
 user.Base.metadata.create_all(bind=engine)
@@ -14,6 +16,13 @@ app = FastAPI(
     version="1.0.0"
 )
 
+# Retried writes with an Idempotency-Key header get the stored response back
+app.add_middleware(
+    IdempotencyMiddleware,
+    store=store,
+    routes=[("POST", "/events/"), ("POST", "/events/{event_id}/attendees")],
+)
+
 # CORS configuration
 app.add_middleware(
     CORSMiddleware,
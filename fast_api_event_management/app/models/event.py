@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, Text, Boolean, ForeignKey
+from sqlalchemy import Column, Integer, String, DateTime, Text, Boolean, ForeignKey, UniqueConstraint
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from app.database.database import Base
@@ -29,6 +29,8 @@ class EventAttendee(Base):
     Model for storing event attendees
     """
     __tablename__ = "event_attendees"
+    # A user registers for an event once, even when concurrent requests race the pre-check
+    __table_args__ = (UniqueConstraint("event_id", "user_id", name="uq_event_attendees_event_user"),)
 
     id = Column(Integer, primary_key=True, index=True)
     event_id = Column(Integer, ForeignKey("events.id", ondelete="CASCADE"), nullable=False)
@@ -1,11 +1,15 @@
-from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from datetime import datetime
 
 from app.database.database import get_db
 from app.models.event import Event, EventAttendee
+from app.models.user import User
 from app.schemas.event import EventCreate, Event as EventSchema, EventUpdate, EventDetail, EventAttendeeCreate
+from app.changefeed.broker import broker, stream_changes
 
 router = APIRouter(
     prefix="/events",
@@ -13,6 +17,18 @@ router = APIRouter(
     responses={404: {"description": "Event not found"}}
 )
 
+def event_data(db_event: Event) -> dict:
+    """Serialize an event for the change feed"""
+    return EventSchema.model_validate(db_event).model_dump(mode="json")
+
+def attendee_data(db_attendee: EventAttendee) -> dict:
+    """Serialize an attendee registration for the change feed"""
+    return {
+        "user_id": db_attendee.user_id,
+        "attended": db_attendee.attended,
+        "registration_date": db_attendee.registration_date.isoformat() if db_attendee.registration_date else None,
+    }
+
 @router.post("/", response_model=EventSchema, status_code=status.HTTP_201_CREATED)
 async def create_event(
     event: EventCreate, 
@@ -25,6 +41,7 @@ async def create_event(
     db.add(db_event)
     db.commit()
     db.refresh(db_event)
+    broker.publish("event.created", db_event.id, event_data(db_event))
     return db_event
 
 @router.get("/", response_model=List[EventSchema])
@@ -55,6 +72,26 @@ async def read_events(
     events = query.offset(skip).limit(limit).all()
     return events
 
+@router.get("/changes")
+async def stream_event_changes(
+    event_id: Optional[int] = None,
+    since: Optional[int] = None,
+    last_event_id: Optional[int] = Header(None)
+):
+    """
+    Stream event and attendee changes as server-sent events.
+
+    Pass `event_id` to only receive changes for one event. Clients resume from a
+    sequence number with `since` or the standard `Last-Event-ID` header.
+    """
+    if since is None:
+        since = last_event_id
+    return StreamingResponse(
+        stream_changes(broker, event_id=event_id, since=since),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 @router.get("/{event_id}", response_model=EventDetail)
 async def read_event(
     event_id: int, 
@@ -88,6 +125,7 @@ async def update_event(
     
     db.commit()
     db.refresh(db_event)
+    broker.publish("event.updated", db_event.id, event_data(db_event))
     return db_event
 
 @router.delete("/{event_id}", status_code=status.HTTP_204_NO_CONTENT)
@@ -104,6 +142,7 @@ async def delete_event(
     
     db.delete(db_event)
     db.commit()
+    broker.publish("event.deleted", event_id, {"id": event_id})
     return None
 
 @router.post("/{event_id}/attendees", status_code=status.HTTP_201_CREATED)
@@ -120,6 +159,10 @@ async def add_attendee(
     if db_event is None:
         raise HTTPException(status_code=404, detail="Event not found")
     
+    # Check if user exists
+    if db.query(User).filter(User.id == attendee.user_id).first() is None:
+        raise HTTPException(status_code=404, detail="User not found")
+    
     # Check if user is already registered
     existing_attendee = db.query(EventAttendee).filter(
         EventAttendee.event_id == event_id,
@@ -140,8 +183,23 @@ async def add_attendee(
     )
     
     db.add(db_attendee)
-    db.commit()
+    try:
+        db.commit()
+    except IntegrityError:
+        # A concurrent registration can get past the check above; anything else is re-raised
+        db.rollback()
+        registered = db.query(EventAttendee).filter(
+            EventAttendee.event_id == event_id,
+            EventAttendee.user_id == attendee.user_id
+        ).first()
+        if registered is None:
+            raise
+        raise HTTPException(
+            status_code=400, 
+            detail="User is already registered for this event"
+        )
     db.refresh(db_attendee)
+    broker.publish("attendee.added", event_id, attendee_data(db_attendee))
     
     return {"message": "Attendee added successfully"}
 
@@ -168,6 +226,7 @@ async def remove_attendee(
     
     db.delete(db_attendee)
     db.commit()
+    broker.publish("attendee.removed", event_id, {"user_id": user_id})
     
     return None
 
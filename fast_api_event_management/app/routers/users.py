@@ -2,13 +2,13 @@ from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
 from typing import List, Optional
 
+from app.changefeed.broker import broker
 from app.database.database import get_db
 from app.models.user import User
 from app.schemas.user import UserCreate, User as UserSchema, UserUpdate, UserWithEvents
-from passlib.context import CryptContext
 
-# Password hashing
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Password hashing context, built on first use so passlib/bcrypt stay out of startup
+_pwd_context = None
 
 router = APIRouter(
     prefix="/users",
@@ -16,9 +16,17 @@ router = APIRouter(
     responses={404: {"description": "User not found"}}
 )
 
+def get_pwd_context():
+    """Return the shared password hashing context, creating it on first call"""
+    global _pwd_context
+    if _pwd_context is None:
+        from passlib.context import CryptContext
+        _pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+    return _pwd_context
+
 def get_password_hash(password: str) -> str:
     """Generate a hashed password"""
-    return pwd_context.hash(password)
+    return get_pwd_context().hash(password)
 
 @router.post("/", response_model=UserSchema, status_code=status.HTTP_201_CREATED)
 async def create_user(
@@ -119,8 +127,13 @@ async def delete_user(
     if db_user is None:
         raise HTTPException(status_code=404, detail="User not found")
     
+    # Deleting the user also removes their registrations, so subscribers are told about each one
+    registered_event_ids = [attendee.event_id for attendee in db_user.attending_events]
+    
     db.delete(db_user)
     db.commit()
+    for event_id in registered_event_ids:
+        broker.publish("attendee.removed", event_id, {"user_id": user_id})
     return None
 
 @router.get("/{user_id}/events", response_model=List[dict])
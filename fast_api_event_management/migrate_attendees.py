@@ -0,0 +1,46 @@
+"""
+One-off migration adding the unique (event_id, user_id) constraint to an
+existing event_attendees table. Tables created before the constraint was added
+to the model don't get it from create_all.
+
+Duplicate registrations are removed first, keeping the earliest one.
+
+Usage (from the project root):
+    python migrate_attendees.py
+"""
+from sqlalchemy import inspect, text
+
+from app.database.database import engine
+
+CONSTRAINT = "uq_event_attendees_event_user"
+
+
+def migrate_attendees():
+    """Deduplicate registrations and add the unique constraint if it's missing"""
+    with engine.begin() as conn:
+        inspector = inspect(conn)
+        if not inspector.has_table("event_attendees"):
+            print("event_attendees doesn't exist yet; it's created with the constraint on startup")
+            return
+        names = {c["name"] for c in inspector.get_unique_constraints("event_attendees")}
+        names |= {i["name"] for i in inspector.get_indexes("event_attendees") if i["unique"]}
+        if CONSTRAINT in names:
+            print("event_attendees is already migrated")
+            return
+
+        removed = conn.execute(text(
+            "DELETE FROM event_attendees WHERE id NOT IN ("
+            "SELECT MIN(id) FROM event_attendees GROUP BY event_id, user_id)"
+        )).rowcount
+        if engine.dialect.name == "sqlite":
+            # SQLite can't add a constraint to an existing table; a unique index enforces the same
+            conn.execute(text(f"CREATE UNIQUE INDEX {CONSTRAINT} ON event_attendees (event_id, user_id)"))
+        else:
+            conn.execute(text(
+                f"ALTER TABLE event_attendees ADD CONSTRAINT {CONSTRAINT} UNIQUE (event_id, user_id)"
+            ))
+        print(f"Removed {removed} duplicate registration(s) and added {CONSTRAINT}")
+
+
+if __name__ == "__main__":
+    migrate_attendees()